@@ -1,13 +1,13 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
-from .models import Task, Category
+from .models import ArchivedTask, Task, Category
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'color_badge', 'tasks_count', 'created_at']
     search_fields = ['name']
-    readonly_fields = ['id', 'created_at']
+    readonly_fields = ['id', 'created_at', 'tasks_count']
     
     def color_badge(self, obj):
         return mark_safe(
@@ -15,10 +15,6 @@ class CategoryAdmin(admin.ModelAdmin):
             f'border-radius: 3px; color: white;">{obj.color}</span>'
         )
     color_badge.short_description = 'Цвет'
-    
-    def tasks_count(self, obj):
-        return obj.tasks.count()
-    tasks_count.short_description = 'Кол-во задач'
 
 
 @admin.register(Task)
@@ -69,4 +65,17 @@ class TaskAdmin(admin.ModelAdmin):
             '<span style="color: green; font-weight: bold; font-size: 14px;">'
             '✓ В СРОК</span>'
         )
-    overdue_display.short_description = 'Статус просрочки'
\ No newline at end of file
+    overdue_display.short_description = 'Статус просрочки'
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'status', 'deadline', 'created_at', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    search_fields = ['title', 'description', 'user__username']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,3 +5,6 @@ class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tasks'
     verbose_name = 'Задачи'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,142 @@
+"""
+ETag для GET-эндпоинтов задач и категорий.
+
+ETag строится из счётчиков версий в кеше (Redis): версия задач
+пользователя и общая версия категорий (их имена вложены в ответы задач).
+Счётчики tasks_count версионируются отдельно (CATEGORY_COUNTS_SCOPE) -
+их меняет любая запись задач, а в ответы задач они не входят. Счётчик увеличивается после коммита любой записи,
+поэтому совпавший If-None-Match отвечается 304 до запросов к БД
+и сериализации.
+"""
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_SCOPE = 'categories'
+CATEGORY_COUNTS_SCOPE = 'category_counts'
+
+# Пропавший ключ заново заполняется time_ns(), поэтому срок жизни безопасен
+VERSION_TTL = 7 * 24 * 3600
+
+
+def tasks_scope(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def _version_cache_key(scope) -> str:
+    return f"tasks:version:{scope}"
+
+
+def get_versions(*scopes):
+    """
+    Текущие версии scopes одним запросом к кешу.
+    None - кеш недоступен (тогда ETag не выдаётся).
+    """
+    keys = [_version_cache_key(scope) for scope in scopes]
+    try:
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                cache.add(key, time.time_ns(), VERSION_TTL)
+                versions[key] = cache.get(key)
+    except Exception as e:
+        logger.warning(f"⚠️ Version cache unavailable: {e}")
+        return None
+    return [versions[key] for key in keys]
+
+
+def _bump(scope):
+    key = _version_cache_key(scope)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), VERSION_TTL)
+    except Exception as e:
+        logger.warning(f"⚠️ Version cache unavailable: {e}")
+
+
+def bump_version(scope):
+    """
+    Сменить версию scope после коммита текущей транзакции: раньше
+    читатель мог бы запомнить новый ETag вместе со старыми данными.
+    """
+    transaction.on_commit(lambda: _bump(scope))
+
+
+def bump_tasks_version(user_id):
+    bump_version(tasks_scope(user_id))
+
+
+def bump_categories_version():
+    bump_version(CATEGORIES_SCOPE)
+
+
+def bump_category_counts_version():
+    bump_version(CATEGORY_COUNTS_SCOPE)
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    ETag / If-None-Match для GET и HEAD запросов ViewSet.
+    Наследник определяет get_etag_parts() - версии данных ответа.
+    """
+
+    etag = None
+
+    def get_etag_parts(self) -> list:
+        raise NotImplementedError
+
+    def compute_etag(self, request):
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+
+        # Разные пользователи, фильтры и форматы - разные ответы
+        source = '|'.join(map(str, [
+            request.user.pk,
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            *parts
+        ]))
+        return quote_etag(hashlib.md5(source.encode(), usedforsecurity=False).hexdigest())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        self.etag = self.compute_etag(request)
+        if self.etag:
+            etags = parse_etags(request.headers.get('If-None-Match', ''))
+            if self.etag in etags or '*' in etags:
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if self.etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self.etag
+            # Ответ зависит от токена - промежуточным кешам не отдавать
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,45 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+
+from .models import Task
+
+
+def build_search_query(terms):
+    """
+    Собрать tsquery из поисковых термов: все слова обязательны,
+    каждое ищется по префиксу ("отч" найдёт "отчёт").
+    Возвращает None если значимых слов нет.
+    """
+    words = [word for term in terms for word in re.findall(r'\w+', term)]
+    if not words:
+        return None
+    
+    raw = ' & '.join(f"{word}:*" for word in words)
+    return SearchQuery(raw, search_type='raw', config=Task.SEARCH_CONFIG)
+
+
+class TaskSearchFilter(filters.SearchFilter):
+    """
+    ?search= по полнотекстовому индексу задач (Task.search_vector, GIN)
+    вместо UPPER(...) LIKE '%q%' по всем задачам пользователя.
+    
+    Без явного ?ordering= результаты сортируются по релевантности,
+    поэтому фильтр должен стоять после OrderingFilter.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        query = build_search_query(self.get_search_terms(request))
+        if query is None:
+            return queryset
+        
+        queryset = queryset.filter(search_vector=query)
+        
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset
+        
+        return queryset.annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created_at')
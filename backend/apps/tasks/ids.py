@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+from ulid import base32
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+class MonotonicULIDGenerator:
+    """
+    Генератор ULID, монотонный в пределах процесса.
+    
+    В новой миллисекунде случайная часть берётся из os.urandom,
+    в той же миллисекунде - увеличивается на 1 (monotonic режим спецификации ULID).
+    Поэтому id, созданные подряд (bulk_create), сортируются в порядке создания,
+    а вставки в индекс первичного ключа идут в правый край B-tree.
+    Если часы пошли назад, продолжаем от последнего timestamp.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        # Дочерний процесс (prefork worker) не должен продолжать чужую последовательность
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+    
+    def _reset(self):
+        self._last_ms = 0
+        self._last_random = 0
+    
+    def _next(self) -> int:
+        ms = time.time_ns() // 1_000_000
+        
+        if ms > self._last_ms:
+            self._last_ms = ms
+            self._last_random = int.from_bytes(os.urandom(10), 'big')
+        elif self._last_random < _RANDOM_MAX:
+            self._last_random += 1
+        else:
+            # Случайная часть исчерпана - занимаем следующую миллисекунду
+            self._last_ms += 1
+            self._last_random = int.from_bytes(os.urandom(10), 'big')
+        
+        return (self._last_ms << _RANDOM_BITS) | self._last_random
+    
+    def generate(self) -> str:
+        """Один ULID строкой"""
+        with self._lock:
+            value = self._next()
+        return base32.encode(value.to_bytes(16, 'big'))
+    
+    def generate_many(self, count: int) -> list:
+        """count возрастающих ULID одним захватом блокировки"""
+        with self._lock:
+            values = [self._next() for _ in range(count)]
+        return [base32.encode(value.to_bytes(16, 'big')) for value in values]
+
+
+_generator = MonotonicULIDGenerator()
+
+
+def generate_ulid() -> str:
+    """Новый ULID строкой (монотонный в пределах процесса)"""
+    return _generator.generate()
+
+
+def generate_ulids(count: int) -> list:
+    """count новых возрастающих ULID"""
+    return _generator.generate_many(count)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.tasks.partitions import PARENT_TABLE, ensure_task_partitions, get_partition_upper_bounds
+
+
+class Command(BaseCommand):
+    help = 'Показать и создать месячные партиции таблицы tasks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.TASK_PARTITIONS_AHEAD,
+            help='Сколько месяцев вперёд должно быть покрыто партициями'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Только показать партиции и число строк в них'
+        )
+    
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if get_partition_upper_bounds(cursor) is None:
+                raise CommandError(f'Table "{PARENT_TABLE}" is not partitioned')
+        
+        if not options['list']:
+            created = ensure_task_partitions(options['ahead'])
+            for name in created:
+                self.stdout.write(self.style.SUCCESS(f'Created {name}'))
+            if not created:
+                self.stdout.write('Partitions are up to date')
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                ORDER BY c.relname
+                """,
+                [PARENT_TABLE]
+            )
+            for name, bound, rows in cursor.fetchall():
+                self.stdout.write(f'{name:<16} {bound}  ~{max(rows, 0)} rows')
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 00:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('notification_sent', False), ('status__in', ['pending', 'in_progress'])), fields=['deadline'], name='tasks_deadline_notify_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 00:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_tasks_count(apps, schema_editor):
+    """Заполнить счётчик для существующих категорий одним UPDATE"""
+    Category = apps.get_model('tasks', 'Category')
+    Through = apps.get_model('tasks', 'Task').categories.through
+
+    counts = Through.objects.filter(
+        category_id=OuterRef('pk')
+    ).order_by().values('category_id').annotate(c=Count('*')).values('c')
+
+    Category.objects.update(tasks_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='tasks_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Кол-во задач'),
+        ),
+        migrations.RunPython(fill_tasks_count, migrations.RunPython.noop),
+    ]
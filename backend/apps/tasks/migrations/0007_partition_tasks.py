@@ -0,0 +1,136 @@
+# Generated by Django 6.0 on 2026-10-17 00:45
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, transaction
+
+from apps.tasks.partitions import (
+    add_months,
+    ensure_task_partitions,
+    month_start,
+    ulid_lower_bound,
+)
+
+
+def partition_tasks(apps, schema_editor):
+    """
+    Превратить tasks в партиционированную по id таблицу.
+
+    Существующая таблица не копируется: она переименовывается в tasks_legacy
+    и подключается партицией FROM (MINVALUE) TO (начало следующего месяца).
+    Миграция не атомарная, шаги идут отдельными транзакциями:
+
+    1. CHECK по границе добавляется NOT VALID и проверяется VALIDATE ещё
+       на исходной tasks: полное сканирование идёт под SHARE UPDATE
+       EXCLUSIVE, чтение и запись задач не блокируются.
+    2. Одна короткая транзакция: RENAME, новый родитель, ATTACH PARTITION
+       (проверенный CHECK позволяет пропустить сканирование). ACCESS
+       EXCLUSIVE на tasks держится только на время DDL - это единственный
+       перерыв для запросов к задачам.
+    3. Внешние ключи на tasks пересоздаются в шаге 2 как NOT VALID
+       и проверяются VALIDATE после него, без эксклюзивной блокировки.
+
+    Если миграция пересекает границу месяца, вставки с id нового месяца
+    между шагами 1 и 2 отклоняются CHECK-ограничением.
+    Индексы и ограничения родителя создаются по определениям исходной
+    таблицы с теми же именами - ATTACH подхватывает совпадающие индексы
+    партиции без перестроения.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    legacy_upper = ulid_lower_bound(add_months(month_start(datetime.now(timezone.utc)), 1))
+
+    # 1. Проверка границы без эксклюзивной блокировки (повтор после сбоя начинает заново)
+    with connection.cursor() as cursor:
+        cursor.execute('ALTER TABLE tasks DROP CONSTRAINT IF EXISTS tasks_legacy_bound')
+        cursor.execute(
+            'ALTER TABLE tasks ADD CONSTRAINT tasks_legacy_bound '
+            'CHECK (id IS NOT NULL AND id < %s) NOT VALID',
+            [legacy_upper]
+        )
+        cursor.execute('ALTER TABLE tasks VALIDATE CONSTRAINT tasks_legacy_bound')
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = 'tasks'::regclass AND contype IN ('p', 'u', 'f')
+            ORDER BY contype = 'f', conname
+            """
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = 'tasks'::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+            """
+        )
+        indexes = cursor.fetchall()
+
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE confrelid = 'tasks'::regclass AND contype = 'f'
+            """
+        )
+        referencing = cursor.fetchall()
+
+        # 2. Старая таблица - будущая партиция; освобождаем имена
+        cursor.execute('ALTER TABLE tasks RENAME TO tasks_legacy')
+        for name, _ in constraints:
+            cursor.execute(
+                f'ALTER TABLE tasks_legacy RENAME CONSTRAINT "{name}" TO "{name[:56]}_legacy"'
+            )
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name[:56]}_legacy"')
+
+        # Партиционированный родитель с теми же колонками, индексами, ограничениями
+        cursor.execute(
+            'CREATE TABLE tasks (LIKE tasks_legacy INCLUDING DEFAULTS INCLUDING GENERATED) '
+            'PARTITION BY RANGE (id)'
+        )
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE tasks ADD CONSTRAINT "{name}" {definition}')
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+        # Старые данные подключаются без сканирования: CHECK уже проверен
+        cursor.execute(
+            'ALTER TABLE tasks ATTACH PARTITION tasks_legacy FOR VALUES FROM (MINVALUE) TO (%s)',
+            [legacy_upper]
+        )
+        cursor.execute('ALTER TABLE tasks_legacy DROP CONSTRAINT tasks_legacy_bound')
+
+        # Внешние ключи на tasks (tasks_categories) - на нового родителя, пока без проверки
+        for table, name, definition in referencing:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID')
+
+    # 3. Проверка внешних ключей вне транзакции с ACCESS EXCLUSIVE
+    with connection.cursor() as cursor:
+        for table, name, _ in referencing:
+            cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"')
+
+    ensure_task_partitions(settings.TASK_PARTITIONS_AHEAD, using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    # Шаги партиционирования идут отдельными транзакциями (см. partition_tasks)
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0006_tasks_archive'),
+    ]
+
+    operations = [
+        # Обратно не откатывается: данные уже могут лежать в месячных партициях
+        migrations.RunPython(partition_tasks),
+    ]
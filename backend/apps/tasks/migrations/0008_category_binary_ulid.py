@@ -0,0 +1,130 @@
+# Generated by Django 6.0 on 2026-10-17 00:52
+
+import apps.tasks.models
+from django.db import migrations
+
+# Crockford base32 <-> uuid на стороне БД: конвертация на месте, без выгрузки строк
+CONVERSION_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION ulid_to_uuid(value text) RETURNS uuid
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    alphabet constant text := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+    bits varbit := B'';
+    hex text := '';
+BEGIN
+    FOR i IN 1..26 LOOP
+        bits := bits || (position(substr(upper(value), i, 1) IN alphabet) - 1)::bit(5);
+    END LOOP;
+    -- 26 символов = 130 бит, старшие 2 бита ULID всегда нулевые
+    bits := substring(bits FROM 3);
+    FOR i IN 0..31 LOOP
+        hex := hex || to_hex(substring(bits FROM i * 4 + 1 FOR 4)::bit(4)::int);
+    END LOOP;
+    RETURN hex::uuid;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION uuid_to_ulid(value uuid) RETURNS text
+LANGUAGE plpgsql IMMUTABLE STRICT AS $$
+DECLARE
+    alphabet constant text := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+    bits varbit := B'00' || ('x' || replace(value::text, '-', ''))::bit(128);
+    result text := '';
+BEGIN
+    FOR i IN 0..25 LOOP
+        result := result || substr(alphabet, substring(bits FROM i * 5 + 1 FOR 5)::bit(5)::int + 1, 1);
+    END LOOP;
+    RETURN result;
+END
+$$;
+"""
+
+DROP_CONVERSION_FUNCTIONS_SQL = """
+DROP FUNCTION IF EXISTS ulid_to_uuid(text);
+DROP FUNCTION IF EXISTS uuid_to_ulid(uuid);
+"""
+
+# Колонки, хранящие id категории: сам ключ и FK в таблицах связей
+CATEGORY_ID_COLUMNS = [
+    ('categories', 'id'),
+    ('tasks_categories', 'category_id'),
+    ('tasks_archive_categories', 'category_id'),
+]
+
+
+def _convert_category_ids(schema_editor, column_type, using, create_like_indexes):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE confrelid = 'categories'::regclass AND contype = 'f'
+            """
+        )
+        foreign_keys = cursor.fetchall()
+        for table, name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+
+        for table, column in CATEGORY_ID_COLUMNS:
+            # varchar_pattern_ops (_like) индексы к uuid неприменимы
+            cursor.execute(
+                """
+                SELECT i.relname FROM pg_index x
+                JOIN pg_class i ON i.oid = x.indexrelid
+                JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0]
+                WHERE x.indrelid = %s::regclass AND x.indnatts = 1
+                  AND a.attname = %s AND i.relname LIKE '%%\\_like'
+                """,
+                [table, column]
+            )
+            for (index_name,) in cursor.fetchall():
+                cursor.execute(f'DROP INDEX "{index_name}"')
+
+            cursor.execute(
+                f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {column_type} '
+                f'USING {using}({column})'
+            )
+
+            if create_like_indexes:
+                index_name = schema_editor._create_index_name(table, [column], suffix='_like')
+                cursor.execute(
+                    f'CREATE INDEX "{index_name}" ON {table} ({column} varchar_pattern_ops)'
+                )
+
+        for table, name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def to_uuid(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _convert_category_ids(schema_editor, 'uuid', 'ulid_to_uuid', create_like_indexes=False)
+
+
+def to_varchar(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _convert_category_ids(schema_editor, 'varchar(26)', 'uuid_to_ulid', create_like_indexes=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_partition_tasks'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CONVERSION_FUNCTIONS_SQL, DROP_CONVERSION_FUNCTIONS_SQL),
+                migrations.RunPython(to_uuid, to_varchar),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='category',
+                    name='id',
+                    field=apps.tasks.models.BinaryULIDField(editable=False, max_length=26, primary_key=True, serialize=False, unique=True),
+                ),
+            ],
+        ),
+    ]
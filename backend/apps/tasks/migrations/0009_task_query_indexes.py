@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-17 00:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_category_binary_ulid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='tasks_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('deadline__isnull', False), ('status__in', ['pending', 'in_progress'])), fields=['user', 'deadline'], name='tasks_user_overdue_idx'),
+        ),
+        # (user, status) - префикс нового индекса; удаляем после создания замены
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_user_id_a53e17_idx',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0 on 2026-10-17 12:10
+
+from django.db import migrations
+
+from apps.tasks.partitions import ensure_default_partition
+
+
+def create_default_partition(apps, schema_editor):
+    """DEFAULT-партиция: вставка с id вне созданных месяцев не падает"""
+    ensure_default_partition(using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_task_query_indexes'),
+    ]
+
+    operations = [
+        # Обратно не откатывается: в партиции уже могут лежать задачи
+        migrations.RunPython(create_default_partition),
+    ]
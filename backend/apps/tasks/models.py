@@ -1,11 +1,29 @@
 from django.db import models
 
 # Create your models here.
+import uuid
+from datetime import timedelta
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from ulid import ULID
 
+from .ids import generate_ulid, generate_ulids
+
+
+def assign_ulids(objs):
+    """
+    Назначить возрастающие ULID объектам без id - до bulk_create,
+    когда id нужны заранее (строки M2M связей) и должны идти в порядке вставки.
+    """
+    pending = [obj for obj in objs if not obj.pk]
+    for obj, value in zip(pending, generate_ulids(len(pending))):
+        obj.pk = value
+    return objs
+
 
 class ULIDField(models.CharField):
     """
@@ -28,21 +46,58 @@ class ULIDField(models.CharField):
     
     def pre_save(self, model_instance, add):
         if add and not getattr(model_instance, self.attname):
-            value = str(ULID())
+            value = generate_ulid()
             setattr(model_instance, self.attname, value)
             return value
         return super().pre_save(model_instance, add)
 
 
+class BinaryULIDField(ULIDField):
+    """
+    ULID в 16-байтной колонке uuid (Postgres) вместо varchar(26).
+    
+    В Python и API значение остаётся строкой Crockford base32;
+    индексы и JOIN'ы по ключу сравнивают фиксированные 16 байт без collation.
+    На других БД хранится как обычный ULIDField.
+    """
+    
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'uuid'
+        return super().db_type(connection)
+    
+    def rel_db_type(self, connection):
+        return self.db_type(connection)
+    
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, uuid.UUID):
+            return str(ULID.from_uuid(value))
+        return value
+    
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None or connection.vendor != 'postgresql':
+            return value
+        if isinstance(value, uuid.UUID):
+            return value
+        return ULID.from_str(str(value).upper()).to_uuid()
+
+
 class Category(models.Model):
     """Категория (тег) для задач"""
     
-    id = ULIDField()
+    id = BinaryULIDField()
     name = models.CharField('Название', max_length=100, unique=True)
     color = models.CharField('Цвет', max_length=7, default='#808080', 
                             help_text='HEX цвет для отображения в боте')
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     
+    # Денормализованный счётчик задач: поддерживается сигналами
+    # (apps.tasks.signals) и сверяется reconcile_category_tasks_count
+    tasks_count = models.PositiveIntegerField(
+        'Кол-во задач', default=0, editable=False, db_index=True
+    )
+    
     class Meta:
         db_table = 'categories'
         verbose_name = 'Категория'
@@ -56,6 +111,12 @@ class Category(models.Model):
 class Task(models.Model):
     """Задача в ToDo списке"""
     
+    # За сколько до deadline отправляем уведомление
+    NOTIFICATION_WINDOW = timedelta(hours=1)
+    
+    # Конфигурация полнотекстового поиска Postgres
+    SEARCH_CONFIG = 'russian'
+    
     class Status(models.TextChoices):
         PENDING = 'pending', 'Ожидает'
         IN_PROGRESS = 'in_progress', 'В работе'
@@ -99,17 +160,54 @@ class Task(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
     
+    # Полнотекстовый индекс (title важнее description).
+    # Генерируемая колонка - Postgres пересчитывает её при каждой записи
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
     class Meta:
         db_table = 'tasks'
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'status']),
+            # /tasks/my/?status=... ORDER BY -created_at: фильтр и сортировка по одному индексу
+            models.Index(
+                fields=['user', 'status', '-created_at'],
+                name='tasks_user_status_created_idx',
+            ),
+            # /tasks/overdue/: только активные задачи с дедлайном
+            models.Index(
+                fields=['user', 'deadline'],
+                name='tasks_user_overdue_idx',
+                condition=models.Q(
+                    deadline__isnull=False,
+                    status__in=['pending', 'in_progress'],
+                ),
+            ),
             models.Index(fields=['deadline']),
             models.Index(fields=['created_at']),
+            GinIndex(fields=['search_vector'], name='tasks_search_vector_idx'),
+            # Частичный индекс для check_task_deadlines:
+            # содержит только задачи, по которым ещё ждём уведомление
+            models.Index(
+                fields=['deadline'],
+                name='tasks_deadline_notify_idx',
+                condition=models.Q(
+                    notification_sent=False,
+                    status__in=['pending', 'in_progress'],
+                ),
+            ),
         ]
     
+    is_archived = False
+    
     def __str__(self):
         return f"{self.title} ({self.user})"
     
@@ -137,4 +235,68 @@ class Task(models.Model):
         time_until_deadline = self.deadline - now
         
         # Уведомляем если осталось меньше часа или уже просрочено
-        return time_until_deadline.total_seconds() <= 3600
\ No newline at end of file
+        return time_until_deadline <= self.NOTIFICATION_WINDOW
+
+
+class ArchivedTask(models.Model):
+    """
+    Архивная задача (таблица tasks_archive).
+    
+    Старые завершённые и отменённые задачи переносятся сюда пачками
+    (archive_old_tasks), чтобы горячая таблица tasks и её индексы
+    оставались маленькими. Читаются через ?include_archived=1.
+    Категории архивных задач в Category.tasks_count не учитываются.
+    """
+    
+    # id переносится из tasks как есть
+    id = models.CharField(primary_key=True, max_length=26, editable=False)
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        verbose_name='Пользователь'
+    )
+    
+    title = models.CharField('Название', max_length=255)
+    description = models.TextField('Описание', blank=True)
+    status = models.CharField('Статус', max_length=20, choices=Task.Status.choices)
+    
+    categories = models.ManyToManyField(
+        Category,
+        related_name='archived_tasks',
+        verbose_name='Категории',
+        blank=True,
+        db_table='tasks_archive_categories'
+    )
+    
+    deadline = models.DateTimeField('Срок выполнения', null=True, blank=True)
+    notification_sent = models.BooleanField('Уведомление отправлено', default=False)
+    created_at = models.DateTimeField('Дата создания')
+    updated_at = models.DateTimeField('Дата обновления')
+    archived_at = models.DateTimeField('Дата архивации', default=timezone.now)
+    
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=Task.SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=Task.SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    
+    # В архиве только завершённые/отменённые задачи
+    is_overdue = False
+    is_archived = True
+    
+    class Meta:
+        db_table = 'tasks_archive'
+        verbose_name = 'Архивная задача'
+        verbose_name_plural = 'Архив задач'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} ({self.user})"
@@ -0,0 +1,66 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ULIDCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по ULID.
+
+    ULID начинается с timestamp, поэтому порядок по id совпадает с порядком
+    создания. Следующая страница выбирается через WHERE id < :cursor
+    по индексу первичного ключа - без OFFSET и без COUNT(*).
+    """
+
+    ordering = '-id'
+    # Клиент (бот) может запросить страницу меньше PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        # ?ordering= из OrderingFilter здесь не учитываем:
+        # seek возможен только по уникальному ключу
+        return (self.ordering,)
+
+
+class ULIDPagination(PageNumberPagination):
+    """
+    Пагинация по умолчанию для API.
+
+    Без параметров работает как обычная PageNumberPagination (page + count).
+    С ?pagination=cursor переключается на ULIDCursorPagination:
+    ответ содержит next/previous ссылки с параметром cursor и не содержит count.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_pagination_class = ULIDCursorPagination
+
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        """Запрошен ли cursor-режим"""
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode:
+            return True
+        return self.cursor_pagination_class.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
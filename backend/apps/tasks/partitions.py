@@ -0,0 +1,155 @@
+"""
+Range-партиционирование таблицы tasks по месяцам.
+
+ULID начинается с 48-битного timestamp (мс), поэтому id задач, созданных
+в одном месяце, лежат в строковом диапазоне
+[ulid_lower_bound(начало месяца), ulid_lower_bound(начало следующего)).
+Партиции tasks_pYYYYMM создаются заранее (create_task_partitions в beat,
+manage.py task_partitions), всё созданное до перехода лежит в tasks_legacy.
+id вне созданных месяцев (beat долго не работал, чужие часы в ULID)
+попадают в DEFAULT-партицию tasks_default вместо ошибки вставки.
+"""
+import logging
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connections
+from ulid import ULID
+
+PARENT_TABLE = 'tasks'
+PARTITION_PREFIX = 'tasks_p'
+DEFAULT_PARTITION = 'tasks_default'
+
+logger = logging.getLogger(__name__)
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([0-9A-Z]{26})'\)")
+
+
+def ulid_lower_bound(moment: datetime) -> str:
+    """Наименьший ULID с timestamp не раньше moment"""
+    ms = int(moment.timestamp() * 1000)
+    return str(ULID.from_bytes(ms.to_bytes(6, 'big') + bytes(10)))
+
+
+def month_start(moment: datetime) -> datetime:
+    """Начало месяца (UTC)"""
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Сдвинуть начало месяца на months месяцев"""
+    index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_partition(start: datetime) -> tuple:
+    """(имя, нижняя граница, верхняя граница) партиции месяца start"""
+    return (
+        f"{PARTITION_PREFIX}{start:%Y%m}",
+        ulid_lower_bound(start),
+        ulid_lower_bound(add_months(start, 1)),
+    )
+
+
+def get_partition_upper_bounds(cursor):
+    """
+    Верхние границы существующих партиций tasks.
+    None - если tasks не партиционирована (SQLite, тестовая БД без миграций).
+    """
+    if cursor.db.vendor != 'postgresql':
+        return None
+
+    cursor.execute(
+        "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+        [PARENT_TABLE]
+    )
+    row = cursor.fetchone()
+    if row is None or row[0] != 'p':
+        return None
+
+    cursor.execute(
+        """
+        SELECT pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        """,
+        [PARENT_TABLE]
+    )
+    bounds = []
+    for (expr,) in cursor.fetchall():
+        match = _UPPER_BOUND_RE.search(expr or '')
+        if match:
+            bounds.append(match.group(1))
+    return bounds
+
+
+def ensure_default_partition(using: str = 'default') -> bool:
+    """
+    Создать DEFAULT-партицию tasks. Возвращает True, если она создана.
+    Пока она пуста, создание месячной партиции проверяет её мгновенно.
+    """
+    with connections[using].cursor() as cursor:
+        if get_partition_upper_bounds(cursor) is None:
+            return False
+        cursor.execute("SELECT to_regclass(%s) IS NULL", [DEFAULT_PARTITION])
+        if not cursor.fetchone()[0]:
+            return False
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{PARENT_TABLE}" DEFAULT')
+    return True
+
+
+def _default_partition_has_rows(cursor, lower: str, upper: str) -> bool:
+    """Есть ли в DEFAULT-партиции строки диапазона [lower, upper)"""
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [DEFAULT_PARTITION])
+    if not cursor.fetchone()[0]:
+        return False
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE id >= %s AND id < %s)',
+        [lower, upper]
+    )
+    return cursor.fetchone()[0]
+
+
+def ensure_task_partitions(months_ahead: int, now: datetime = None, using: str = 'default') -> list:
+    """
+    Создать партиции так, чтобы текущий и months_ahead следующих месяцев
+    были покрыты. Партиции создаются подряд от последней существующей,
+    поэтому пропуски (beat не работал) тоже закрываются.
+    Месяц, строки которого уже лежат в DEFAULT-партиции, пропускается:
+    Postgres не создаст партицию, пересекающуюся с её данными, - такие
+    строки остаются в tasks_default (без отсечения партиций).
+    Возвращает имена только действительно созданных партиций.
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    end = add_months(month_start(now), months_ahead + 1)
+
+    with connections[using].cursor() as cursor:
+        bounds = get_partition_upper_bounds(cursor)
+        if bounds is None:
+            return []
+
+        if bounds:
+            month = month_start(ULID.from_str(max(bounds)).datetime)
+        else:
+            month = month_start(now)
+
+        created = []
+        while month < end:
+            name, lower, upper = month_partition(month)
+            month = add_months(month, 1)
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+            if cursor.fetchone()[0]:
+                continue
+            if _default_partition_has_rows(cursor, lower, upper):
+                logger.warning(f"⚠️ Rows of {name} are in {DEFAULT_PARTITION}, partition skipped")
+                continue
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{PARENT_TABLE}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper]
+            )
+            created.append(name)
+
+    return created
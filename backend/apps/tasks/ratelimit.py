@@ -0,0 +1,155 @@
+import logging
+import random
+import time
+
+import redis
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Token bucket на два ключа сразу: глобальный лимит бота и лимит чата.
+# Токен списывается только если он есть в обоих bucket'ах, иначе
+# возвращается время ожидания в мс. Ключ blocked выставляется при 429
+# и останавливает отправку для всех worker'ов на retry_after.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local blocked = redis.call('PTTL', KEYS[3])
+if blocked > 0 then
+    return blocked
+end
+
+local function refill(key, rate, capacity)
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    return math.min(capacity, tokens + (now - ts) * rate / 1000)
+end
+
+local global_rate = tonumber(ARGV[1])
+local chat_rate = tonumber(ARGV[2])
+
+local global_tokens = refill(KEYS[1], global_rate, global_rate)
+local chat_tokens = refill(KEYS[2], chat_rate, chat_rate)
+
+local wait = 0
+if global_tokens < 1 then
+    wait = math.max(wait, math.ceil((1 - global_tokens) * 1000 / global_rate))
+end
+if chat_tokens < 1 then
+    wait = math.max(wait, math.ceil((1 - chat_tokens) * 1000 / chat_rate))
+end
+
+if wait == 0 then
+    global_tokens = global_tokens - 1
+    chat_tokens = chat_tokens - 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', global_tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 60000)
+redis.call('HSET', KEYS[2], 'tokens', chat_tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[2], 60000)
+
+return wait
+"""
+
+
+class TelegramRetryAfter(requests.RequestException):
+    """Telegram попросил подождать (429) или лимитер не выдал токен вовремя"""
+
+    def __init__(self, retry_after: float, *args, **kwargs):
+        self.retry_after = retry_after
+        super().__init__(f"Retry after {retry_after}s", *args, **kwargs)
+
+
+class TelegramRateLimiter:
+    """
+    Общий для всех worker'ов лимитер исходящих сообщений в Telegram.
+
+    Состояние хранится в Redis, поэтому лимиты (глобальный и на чат)
+    соблюдаются суммарно по всем процессам. Если Redis недоступен,
+    лимитер пропускает отправку (fail-open) - уведомление важнее.
+    """
+
+    def __init__(self, client: redis.Redis, global_rate: float, chat_rate: float,
+                 prefix: str = 'tg:ratelimit', max_wait: float = 2):
+        self.client = client
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.prefix = prefix
+        self.max_wait = max_wait
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    @property
+    def blocked_key(self) -> str:
+        return f"{self.prefix}:blocked"
+
+    def try_acquire(self, chat_id: int) -> float:
+        """
+        Попробовать взять токен.
+
+        Returns:
+            0 если можно отправлять, иначе сколько секунд подождать
+        """
+        wait_ms = self._script(
+            keys=[f"{self.prefix}:global", f"{self.prefix}:chat:{chat_id}", self.blocked_key],
+            args=[self.global_rate, self.chat_rate]
+        )
+        return int(wait_ms) / 1000
+
+    def acquire(self, chat_id: int, timeout: float = None) -> float:
+        """
+        Дождаться токена (не дольше timeout секунд, по умолчанию max_wait).
+
+        Ожидание занимает процесс worker'а, поэтому оно короткое: при
+        большем ожидании (пауза после 429, очередь к чату) возвращается
+        время ожидания, и вызывающий откладывает задачу через countdown.
+
+        Returns:
+            0 если токен получен, иначе сколько ещё секунд ждать
+        """
+        deadline = time.monotonic() + (self.max_wait if timeout is None else timeout)
+
+        while True:
+            try:
+                wait = self.try_acquire(chat_id)
+            except redis.RedisError as e:
+                logger.warning(f"⚠️ Rate limiter unavailable, sending without limit: {e}")
+                return 0
+
+            if wait <= 0:
+                return 0
+
+            if time.monotonic() + wait > deadline:
+                return wait
+
+            # Джиттер, чтобы ожидающие worker'ы не просыпались одновременно
+            time.sleep(min(wait + random.uniform(0, wait / 2), deadline - time.monotonic()))
+
+    def block(self, retry_after: float):
+        """Остановить отправку для всех worker'ов (ответ 429 с retry_after)"""
+        try:
+            self.client.set(self.blocked_key, 1, px=int(retry_after * 1000))
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Failed to store Telegram retry_after: {e}")
+
+
+_limiter = None
+
+
+def get_telegram_rate_limiter() -> TelegramRateLimiter:
+    """Лимитер с настройками из settings (один на процесс)"""
+    global _limiter
+
+    if _limiter is None:
+        _limiter = TelegramRateLimiter(
+            redis.Redis.from_url(settings.REDIS_URL),
+            global_rate=settings.TELEGRAM_GLOBAL_RATE_LIMIT,
+            chat_rate=settings.TELEGRAM_CHAT_RATE_LIMIT,
+            max_wait=settings.TELEGRAM_RATE_LIMIT_MAX_WAIT
+        )
+
+    return _limiter
@@ -1,43 +1,77 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
-from .models import Task, Category
+from ulid import ULID
+from .etags import bump_category_counts_version, bump_tasks_version
+from .models import Task, Category, assign_ulids
+from .stats import invalidate_task_stats
+from .tasks import reschedule_task_notification, schedule_task_notification
 from apps.users.models import User
 
 
+class ULIDStringField(serializers.CharField):
+    """ULID строкой: проверяет формат и приводит к каноническому виду (верхний регистр)"""
+    
+    default_error_messages = {'invalid': 'Invalid ULID.'}
+    
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data).upper()
+        try:
+            return str(ULID.from_str(value))
+        except ValueError:
+            self.fail('invalid')
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Сериализатор для категорий"""
     
-    tasks_count = serializers.IntegerField(read_only=True, required=False)
-    
     class Meta:
         model = Category
         fields = ['id', 'name', 'color', 'created_at', 'tasks_count']
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'tasks_count']
+
+
+class TaskCategorySerializer(serializers.ModelSerializer):
+    """
+    Категория внутри задачи: без tasks_count, иначе любая чужая
+    запись задач меняла бы ответы (и ETag) задач всех пользователей
+    """
+    
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'color', 'created_at']
+        read_only_fields = fields
 
 
 class TaskListSerializer(serializers.ModelSerializer):
     """Сериализатор для списка задач (минимальная информация)"""
     
-    categories = CategorySerializer(many=True, read_only=True)
+    categories = TaskCategorySerializer(many=True, read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
+    is_archived = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'status', 'categories',
-            'deadline', 'is_overdue', 'created_at'
+            'deadline', 'is_overdue', 'is_archived', 'created_at'
         ]
 
 
 class TaskDetailSerializer(serializers.ModelSerializer):
     """Сериализатор для детальной информации о задаче"""
     
-    categories = CategorySerializer(many=True, read_only=True)
+    categories = TaskCategorySerializer(many=True, read_only=True)
     category_ids = serializers.ListField(
-        child=serializers.CharField(),
+        child=ULIDStringField(),
         write_only=True,
         required=False
     )
     is_overdue = serializers.BooleanField(read_only=True)
+    is_archived = serializers.BooleanField(read_only=True)
     user_telegram_id = serializers.IntegerField(source='user.telegram_id', read_only=True)
     
     class Meta:
@@ -45,7 +79,7 @@ class TaskDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'status',
             'categories', 'category_ids',
-            'deadline', 'is_overdue',
+            'deadline', 'is_overdue', 'is_archived',
             'notification_sent',
             'created_at', 'updated_at',
             'user_telegram_id'
@@ -60,19 +94,30 @@ class TaskDetailSerializer(serializers.ModelSerializer):
             categories = Category.objects.filter(id__in=category_ids)
             task.categories.set(categories)
         
+        schedule_task_notification(task)
+        
         return task
     
     def update(self, instance, validated_data):
         category_ids = validated_data.pop('category_ids', None)
+        old_deadline = instance.deadline
+        old_status = instance.status
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        
+        # Новый дедлайн - новое уведомление
+        if instance.deadline != old_deadline:
+            instance.notification_sent = False
+        
         instance.save()
         
         if category_ids is not None:
             categories = Category.objects.filter(id__in=category_ids)
             instance.categories.set(categories)
         
+        reschedule_task_notification(instance, old_status, old_deadline)
+        
         return instance
 
 
@@ -80,7 +125,7 @@ class TaskCreateSerializer(serializers.ModelSerializer):
     """Упрощённый сериализатор для создания задачи через бота"""
     
     category_ids = serializers.ListField(
-        child=serializers.CharField(),
+        child=ULIDStringField(),
         required=False,
         allow_empty=True
     )
@@ -99,4 +144,85 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             categories = Category.objects.filter(id__in=category_ids)
             task.categories.set(categories)
         
-        return task
\ No newline at end of file
+        schedule_task_notification(task)
+        
+        return task
+
+
+class TaskBulkItemSerializer(TaskCreateSerializer):
+    """Элемент массового создания (импорт может сразу задать статус)"""
+    
+    class Meta(TaskCreateSerializer.Meta):
+        fields = TaskCreateSerializer.Meta.fields + ['status']
+
+
+class TaskBulkCreateSerializer(serializers.Serializer):
+    """
+    Массовое создание задач: все элементы валидируются вместе,
+    id генерируются в Python, задачи и связи с категориями вставляются
+    через bulk_create в одной транзакции.
+    """
+    
+    tasks = TaskBulkItemSerializer(many=True, allow_empty=False)
+    
+    def validate_tasks(self, value):
+        if len(value) > settings.TASKS_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Too many tasks: {len(value)} > {settings.TASKS_BULK_MAX_ITEMS}'
+            )
+        return value
+    
+    def create(self, validated_data):
+        user = validated_data['user']
+        items = validated_data['tasks']
+        Through = Task.categories.through
+        
+        # Одним запросом: какие из упомянутых категорий существуют
+        requested = {cid for item in items for cid in item.get('category_ids', [])}
+        existing = set(
+            Category.objects.filter(id__in=requested).values_list('id', flat=True)
+        )
+        
+        item_categories = [item.pop('category_ids', []) for item in items]
+        tasks = assign_ulids([Task(user=user, **item) for item in items])
+        
+        links = [
+            Through(task_id=task.id, category_id=category_id)
+            for task, category_ids in zip(tasks, item_categories)
+            for category_id in dict.fromkeys(category_ids)
+            if category_id in existing
+        ]
+        
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            Through.objects.bulk_create(links)
+            
+            # bulk_create не шлёт m2m_changed/post_save - обновляем сами
+            per_category = Counter(link.category_id for link in links)
+            for category_id, count in per_category.items():
+                Category.objects.filter(pk=category_id).update(
+                    tasks_count=F('tasks_count') + count
+                )
+            
+            invalidate_task_stats(user.pk)
+            bump_tasks_version(user.pk)
+            if per_category:
+                bump_category_counts_version()
+            for task in tasks:
+                schedule_task_notification(task)
+        
+        return tasks
+
+
+class TaskBulkStatusSerializer(serializers.Serializer):
+    """Массовая смена статуса задач"""
+    
+    ids = serializers.ListField(child=ULIDStringField(), allow_empty=False)
+    status = serializers.ChoiceField(choices=Task.Status.choices)
+    
+    def validate_ids(self, value):
+        if len(value) > settings.TASKS_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'Too many tasks: {len(value)} > {settings.TASKS_BULK_MAX_ITEMS}'
+            )
+        return list(dict.fromkeys(value))
@@ -0,0 +1,82 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .etags import bump_categories_version, bump_category_counts_version, bump_tasks_version
+from .models import Category, Task
+from .stats import invalidate_task_stats
+
+
+def _decremented(count):
+    """
+    tasks_count - count, но не меньше 0: рассинхрон (его чинит
+    reconcile_category_tasks_count) не должен ронять запись задачи
+    на CHECK положительного поля
+    """
+    return Greatest(F('tasks_count') - count, 0)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_stats_on_task_write(sender, instance, **kwargs):
+    """Любая запись задачи меняет статистику и ETag задач пользователя"""
+    invalidate_task_stats(instance.user_id)
+    bump_tasks_version(instance.user_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_version_on_category_write(sender, instance, **kwargs):
+    """Имена категорий вложены в ответы задач - меняется ETag всех списков"""
+    bump_categories_version()
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def update_category_tasks_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Поддерживаем Category.tasks_count при изменении связей задача-категория.
+    Для post_add/post_remove Django передаёт в pk_set только реально
+    добавленные/удалённые связи.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    bump_category_counts_version()
+    
+    # Категории вложены в ответы задач: меняется ETag только их владельцев
+    if not reverse:
+        bump_tasks_version(instance.user_id)
+    elif action == 'pre_clear' or pk_set:
+        if action == 'pre_clear':
+            tasks = Task.objects.filter(categories=instance)
+        else:
+            tasks = Task.objects.filter(pk__in=pk_set)
+        for user_id in tasks.order_by().values_list('user_id', flat=True).distinct():
+            bump_tasks_version(user_id)
+    
+    if not reverse:
+        # instance - Task, pk_set - id категорий
+        if action == 'post_add' and pk_set:
+            Category.objects.filter(pk__in=pk_set).update(tasks_count=F('tasks_count') + 1)
+        elif action == 'post_remove' and pk_set:
+            Category.objects.filter(pk__in=pk_set).update(tasks_count=_decremented(1))
+        elif action == 'pre_clear':
+            Category.objects.filter(tasks=instance).update(tasks_count=_decremented(1))
+    else:
+        # instance - Category, pk_set - id задач
+        if action == 'post_add' and pk_set:
+            Category.objects.filter(pk=instance.pk).update(tasks_count=F('tasks_count') + len(pk_set))
+        elif action == 'post_remove' and pk_set:
+            Category.objects.filter(pk=instance.pk).update(tasks_count=_decremented(len(pk_set)))
+        elif action == 'post_clear':
+            Category.objects.filter(pk=instance.pk).update(tasks_count=0)
+
+
+@receiver(pre_delete, sender=Task)
+def decrement_category_tasks_count(sender, instance, **kwargs):
+    """
+    Удаление задачи каскадно удаляет связи без m2m_changed.
+    pre_delete приходит до удаления связей, поэтому join ещё видит их.
+    """
+    if Category.objects.filter(tasks=instance).update(tasks_count=_decremented(1)):
+        bump_category_counts_version()
@@ -0,0 +1,76 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def _stats_cache_key(user_id) -> str:
+    return f"tasks:stats:{user_id}"
+
+
+def compute_task_stats(user) -> dict:
+    """
+    Статистика задач пользователя одним запросом (условная агрегация):
+    количество по статусам, всего, просроченные и с дедлайном сегодня.
+    """
+    now = timezone.now()
+    today_start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+    active = Q(status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS])
+
+    aggregates = {
+        value: Count('id', filter=Q(status=value))
+        for value in Task.Status.values
+    }
+    aggregates['total'] = Count('id')
+    aggregates['overdue'] = Count('id', filter=active & Q(deadline__lt=now))
+    aggregates['due_today'] = Count(
+        'id',
+        filter=active & Q(deadline__gte=today_start, deadline__lt=today_end)
+    )
+
+    return Task.objects.filter(user=user).aggregate(**aggregates)
+
+
+def get_task_stats(user) -> dict:
+    """Статистика задач пользователя из кеша (Redis) или из БД"""
+    key = _stats_cache_key(user.pk)
+
+    try:
+        stats = cache.get(key)
+    except Exception as e:
+        logger.warning(f"⚠️ Stats cache unavailable: {e}")
+        return compute_task_stats(user)
+
+    if stats is None:
+        stats = compute_task_stats(user)
+        try:
+            cache.set(key, stats, settings.TASK_STATS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"⚠️ Stats cache unavailable: {e}")
+
+    return stats
+
+
+def _delete_task_stats(user_id):
+    try:
+        cache.delete(_stats_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"⚠️ Stats cache unavailable: {e}")
+
+
+def invalidate_task_stats(user_id):
+    """
+    Сбросить закешированную статистику (вызывается при записи задач)
+    после коммита текущей транзакции: раньше параллельное чтение
+    закешировало бы статистику без этой записи на весь TTL.
+    """
+    transaction.on_commit(lambda: _delete_task_stats(user_id))
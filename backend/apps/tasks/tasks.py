@@ -1,67 +1,301 @@
-from celery import shared_task
+from celery import shared_task, current_app
+from django.db import connection, transaction
+from django.db.models import Count, F
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+import random
+import time
+import uuid
 
-from .models import Task
+from .etags import bump_category_counts_version, bump_tasks_version
+from .models import ArchivedTask, Category, Task
+from .partitions import ensure_task_partitions
+from .ratelimit import TelegramRetryAfter, get_telegram_rate_limiter
+from .stats import invalidate_task_stats
 
 logger = logging.getLogger(__name__)
 
+# Допуск на рассинхрон часов между web и worker при срабатывании по ETA
+NOTIFICATION_GRACE = timedelta(minutes=1)
 
-@shared_task(bind=True, max_retries=3)
-def send_task_notification(self, task_id: str, user_telegram_id: int):
+# Насколько вперёд ставить ETA-задания. Больше периода check_task_deadlines
+# (30 минут), который ставит более поздние, и меньше visibility_timeout
+# брокера (CELERY_BROKER_TRANSPORT_OPTIONS), иначе Redis переотдаёт задание
+NOTIFICATION_ETA_HORIZON = timedelta(minutes=45)
+
+# Базовая задержка ретрая отправки (удваивается с каждой попыткой)
+RETRY_BASE_DELAY = 60
+
+# Сколько раз ретраить отправку после ошибок сети/API. Ожидания лимита
+# (лимитер, 429) не ошибка и этот бюджет не расходуют
+MAX_SEND_FAILURES = 3
+
+# Нижняя граница задержки ретрая по лимиту: ожидание лимитера может быть
+# долями секунды, и без неё ретраи всей очереди придут почти одновременно
+RATE_LIMIT_RETRY_MIN_DELAY = 1
+
+
+def _notification_job_id(task_id: str, deadline) -> str:
+    """
+    Уникальный id Celery задачи уведомления.
+    
+    Nonce отличает каждое планирование: повторно поставленное уведомление
+    (возврат задачи в работу, прежний дедлайн) не совпадёт с отозванным id,
+    который worker отбрасывает.
+    """
+    return f"task-notification:{task_id}:{int(deadline.timestamp())}:{uuid.uuid4().hex[:12]}"
+
+
+def _notification_job_cache_key(task_id: str) -> str:
+    return f"tasks:notification-job:{task_id}"
+
+
+def _remember_notification_job(task_id: str, job_id: str, eta):
+    """Запомнить id запланированного задания, чтобы его можно было отозвать"""
+    timeout = max((eta - timezone.now()).total_seconds(), 0) + NOTIFICATION_GRACE.total_seconds()
+    try:
+        cache.set(_notification_job_cache_key(task_id), job_id, int(timeout))
+    except Exception as e:
+        logger.warning(f"⚠️ Notification job cache unavailable: {e}")
+
+
+def _notification_job_scheduled(task_id: str) -> bool:
+    try:
+        return cache.get(_notification_job_cache_key(task_id)) is not None
+    except Exception as e:
+        logger.warning(f"⚠️ Notification job cache unavailable: {e}")
+        return False
+
+
+def schedule_task_notification(task: Task):
+    """
+    Запланировать send_task_notification на deadline - NOTIFICATION_WINDOW.
+    
+    Постановка в очередь происходит после коммита транзакции.
+    Если время уведомления уже наступило - задача выполнится сразу.
+    ETA дальше NOTIFICATION_ETA_HORIZON не ставится: такое задание
+    поставит check_task_deadlines, когда до него останется меньше горизонта.
+    """
+    if not task.deadline or task.notification_sent:
+        return
+    
+    if task.status in [Task.Status.COMPLETED, Task.Status.CANCELLED]:
+        return
+    
+    eta = task.deadline - Task.NOTIFICATION_WINDOW
+    if eta > timezone.now() + NOTIFICATION_ETA_HORIZON:
+        return
+    
+    job_id = _notification_job_id(task.id, task.deadline)
+    kwargs = {
+        'task_id': str(task.id),
+        'user_telegram_id': task.user.telegram_id
+    }
+    
+    def enqueue():
+        send_task_notification.apply_async(kwargs=kwargs, eta=eta, task_id=job_id)
+        _remember_notification_job(task.id, job_id, eta)
+    
+    transaction.on_commit(enqueue)
+
+
+def revoke_task_notification(task_id: str):
+    """
+    Отменить запланированное уведомление задачи.
+    
+    Best-effort: если id задания пропал из кеша, устаревшее задание
+    всё равно не захватит задачу (см. _claim_notifications).
+    """
+    def revoke():
+        key = _notification_job_cache_key(task_id)
+        try:
+            job_id = cache.get(key)
+            cache.delete(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Notification job cache unavailable: {e}")
+            return
+        if job_id:
+            current_app.control.revoke(job_id)
+    
+    transaction.on_commit(revoke)
+
+
+def reschedule_task_notification(task: Task, old_status: str, old_deadline):
+    """
+    Обновить уведомление после смены статуса или дедлайна задачи.
+    
+    Прежнее задание отзывается, только если сменился дедлайн или задача
+    завершена/отменена; новое ставится при новом дедлайне или возврате
+    задачи в работу. Переход pending -> in_progress уведомление не трогает.
+    """
+    finished = (Task.Status.COMPLETED, Task.Status.CANCELLED)
+    deadline_changed = task.deadline != old_deadline
+    was_finished = old_status in finished
+    is_finished = task.status in finished
+    
+    if deadline_changed or (is_finished and not was_finished):
+        revoke_task_notification(task.id)
+    if deadline_changed or (was_finished and not is_finished):
+        schedule_task_notification(task)
+
+
+def _claim_notifications(task_ids) -> list:
+    """
+    Атомарно пометить notification_sent=True для задач, которым пора уведомление.
+    
+    Возвращает id захваченных задач. Строки, уже захваченные другим worker'ом,
+    пропускаются (SKIP LOCKED), поэтому повторная доставка (ETA + reconciliation,
+    ретраи брокера) не приводит к дублю сообщения. Устаревшие задачи
+    (дедлайн перенесён, задача завершена) не захватываются.
+    notification_sent есть в ответах задач, поэтому меняется ETag владельцев.
+    """
+    with transaction.atomic():
+        rows = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                id__in=task_ids,
+                notification_sent=False,
+                status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
+                deadline__lte=timezone.now() + Task.NOTIFICATION_WINDOW + NOTIFICATION_GRACE
+            ).order_by().values_list('id', 'user_id')
+        )
+        claimed = [task_id for task_id, _ in rows]
+        if claimed:
+            Task.objects.filter(id__in=claimed).update(notification_sent=True)
+        for user_id in {user_id for _, user_id in rows}:
+            bump_tasks_version(user_id)
+    
+    return claimed
+
+
+def _release_notifications(task_ids):
+    """Снять отметку чтобы ретрай (или reconciliation) смог отправить снова"""
+    with transaction.atomic():
+        tasks = Task.objects.filter(id__in=task_ids)
+        user_ids = set(tasks.order_by().values_list('user_id', flat=True))
+        tasks.update(notification_sent=False)
+        for user_id in user_ids:
+            bump_tasks_version(user_id)
+
+
+def _build_notification_message(task: Task) -> str:
+    """Сформировать текст уведомления (категории берутся из prefetch)"""
+    if task.is_overdue:
+        emoji = "⚠️"
+        status_text = "ПРОСРОЧЕНА"
+    else:
+        emoji = "⏰"
+        status_text = "скоро дедлайн"
+    
+    message = (
+        f"{emoji} <b>{status_text}</b>\n\n"
+        f"📝 Задача: <b>{task.title}</b>\n"
+    )
+    
+    if task.description:
+        message += f"📄 Описание: {task.description}\n"
+    
+    if task.deadline:
+        # Конвертируем в timezone пользователя (America/Adak из settings)
+        local_deadline = timezone.localtime(task.deadline)
+        message += f"⏱ Дедлайн: {local_deadline.strftime('%d.%m.%Y %H:%M')}\n"
+    
+    categories = task.categories.all()
+    if categories:
+        cats = ", ".join([c.name for c in categories])
+        message += f"🏷 Категории: {cats}\n"
+    
+    return message
+
+
+_telegram_session = None
+
+
+def _get_telegram_session() -> requests.Session:
+    """HTTP сессия с пулом keep-alive соединений к Bot API (одна на процесс worker'а)"""
+    global _telegram_session
+    
+    if _telegram_session is None:
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.TELEGRAM_SEND_CONCURRENCY
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        _telegram_session = session
+    
+    return _telegram_session
+
+
+def _send_telegram_message(chat_id: int, text: str):
+    """
+    Отправить сообщение через Telegram Bot API.
+    
+    Перед отправкой берёт токен у общего лимитера. На 429 сохраняет
+    retry_after в лимитере (пауза для всех worker'ов) и бросает TelegramRetryAfter.
+    """
+    limiter = get_telegram_rate_limiter()
+    wait = limiter.acquire(chat_id)
+    if wait:
+        raise TelegramRetryAfter(wait)
+    
+    bot_token = settings.TELEGRAM_BOT_TOKEN
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    
+    payload = {
+        "chat_id": chat_id,
+        "text": text,
+        "parse_mode": "HTML"
+    }
+    
+    response = _get_telegram_session().post(url, json=payload, timeout=10)
+    
+    if response.status_code == 429:
+        try:
+            retry_after = response.json()['parameters']['retry_after']
+        except (ValueError, KeyError, TypeError):
+            retry_after = 1
+        limiter.block(retry_after)
+        raise TelegramRetryAfter(retry_after, response=response)
+    
+    response.raise_for_status()
+
+
+def _retry_countdown(failures: int, retry_after: float = None) -> float:
+    """Задержка перед ретраем: retry_after (не меньше минимума) или экспонента, плюс джиттер"""
+    if retry_after is not None:
+        base = max(retry_after, RATE_LIMIT_RETRY_MIN_DELAY)
+    else:
+        base = RETRY_BASE_DELAY * 2 ** failures
+    return base + random.uniform(0, base / 2)
+
+
+@shared_task(bind=True, max_retries=None)
+def send_task_notification(self, task_id: str, user_telegram_id: int, failures: int = 0):
     """
     Отправить уведомление пользователю в Telegram
     
+    Ожидания лимита ретраятся без ограничения, ошибки отправки - не более
+    MAX_SEND_FAILURES раз (счётчик failures передаётся в ретрай).
+    
     Args:
         task_id: ID задачи
         user_telegram_id: Telegram ID пользователя
+        failures: сколько попыток уже завершилось ошибкой
     """
+    if not _claim_notifications([task_id]):
+        logger.info(f"⏭ Notification for task {task_id} is not due, skipping")
+        return {"status": "skipped", "task_id": task_id}
+    
     try:
-        task = Task.objects.get(id=task_id)
-        
-        # Формируем сообщение
-        if task.is_overdue:
-            emoji = "⚠️"
-            status_text = "ПРОСРОЧЕНА"
-        else:
-            emoji = "⏰"
-            status_text = "скоро дедлайн"
-        
-        message = (
-            f"{emoji} <b>{status_text}</b>\n\n"
-            f"📝 Задача: <b>{task.title}</b>\n"
-        )
+        task = Task.objects.prefetch_related('categories').get(id=task_id)
         
-        if task.description:
-            message += f"📄 Описание: {task.description}\n"
-        
-        if task.deadline:
-            # Конвертируем в timezone пользователя (America/Adak из settings)
-            local_deadline = timezone.localtime(task.deadline)
-            message += f"⏱ Дедлайн: {local_deadline.strftime('%d.%m.%Y %H:%M')}\n"
-        
-        if task.categories.exists():
-            cats = ", ".join([c.name for c in task.categories.all()])
-            message += f"🏷 Категории: {cats}\n"
-        
-        # Отправляем через Telegram Bot API
-        bot_token = settings.TELEGRAM_BOT_TOKEN
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        
-        payload = {
-            "chat_id": user_telegram_id,
-            "text": message,
-            "parse_mode": "HTML"
-        }
-        
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        
-        # Отмечаем что уведомление отправлено
-        task.notification_sent = True
-        task.save(update_fields=['notification_sent'])
+        _send_telegram_message(user_telegram_id, _build_notification_message(task))
         
         logger.info(f"✅ Notification sent for task {task_id} to user {user_telegram_id}")
         
@@ -75,69 +309,401 @@ def send_task_notification(self, task_id: str, user_telegram_id: int):
         logger.error(f"❌ Task {task_id} not found")
         return {"status": "error", "message": "Task not found"}
     
+    except TelegramRetryAfter as e:
+        logger.warning(f"⏳ Telegram rate limit, retry after {e.retry_after}s")
+        _release_notifications([task_id])
+        raise self.retry(exc=e, countdown=_retry_countdown(failures, e.retry_after))
+    
     except requests.RequestException as e:
         logger.error(f"❌ Failed to send notification: {e}")
-        # Retry через 1 минуту
-        raise self.retry(exc=e, countdown=60)
+        _release_notifications([task_id])
+        if failures >= MAX_SEND_FAILURES:
+            raise
+        raise self.retry(
+            exc=e,
+            kwargs={
+                'task_id': task_id,
+                'user_telegram_id': user_telegram_id,
+                'failures': failures + 1
+            },
+            countdown=_retry_countdown(failures)
+        )
     
     except Exception as e:
         logger.error(f"❌ Unexpected error: {e}")
+        _release_notifications([task_id])
         raise
 
 
+@shared_task(bind=True, max_retries=None)
+def send_task_notifications_batch(self, task_ids: list, failures: int = 0):
+    """
+    Отправить уведомления по пачке задач.
+    
+    Задачи загружаются одним запросом (select_related + prefetch_related),
+    сообщения уходят параллельно (TELEGRAM_SEND_CONCURRENCY потоков)
+    через общую keep-alive сессию с темпом, который выдаёт лимитер. Неотправленные задачи возвращаются
+    одним UPDATE и ретраятся отдельной пачкой: упёршиеся в лимит - всегда,
+    с ошибкой отправки - пока failures < MAX_SEND_FAILURES.
+    
+    Args:
+        task_ids: ID задач
+        failures: сколько попыток пачки уже завершилось ошибкой
+    """
+    claimed = _claim_notifications(task_ids)
+    
+    if not claimed:
+        return {"status": "skipped", "sent": 0, "failed": 0}
+    
+    sent_ids = []
+    limited_ids = []
+    failed_ids = []
+    retry_after = None
+    
+    try:
+        tasks = Task.objects.filter(
+            id__in=claimed
+        ).select_related('user').prefetch_related('categories')
+        
+        # Сообщения собираем заранее: в потоках нет обращений к БД
+        messages = {
+            task.id: (task.user.telegram_id, _build_notification_message(task))
+            for task in tasks
+        }
+        
+        with ThreadPoolExecutor(max_workers=settings.TELEGRAM_SEND_CONCURRENCY) as pool:
+            futures = {
+                pool.submit(_send_telegram_message, chat_id, text): task_id
+                for task_id, (chat_id, text) in messages.items()
+            }
+            
+            for future in as_completed(futures):
+                task_id = futures[future]
+                try:
+                    future.result()
+                    sent_ids.append(task_id)
+                except TelegramRetryAfter as e:
+                    retry_after = max(retry_after or 0, e.retry_after)
+                    limited_ids.append(task_id)
+                except Exception as e:
+                    # Любая ошибка (сеть, payload, Redis лимитера) - задача уйдёт в ретрай
+                    logger.error(f"❌ Failed to send notification for task {task_id}: {e}")
+                    failed_ids.append(task_id)
+    finally:
+        # Захваченное и не отправленное возвращаем даже при исключении вне цикла,
+        # иначе notification_sent=True останется без сообщения.
+        # Исчезнувшие задачи (удалены между claim и загрузкой) UPDATE не найдёт
+        unsent = set(claimed) - set(sent_ids)
+        if unsent:
+            _release_notifications(unsent)
+    
+    logger.info(
+        f"✅ Batch notifications: sent {len(sent_ids)}, "
+        f"rate limited {len(limited_ids)}, failed {len(failed_ids)}"
+    )
+    
+    # Ретраим только неотправленные; после ошибок - пока не исчерпан бюджет
+    retry_ids = limited_ids + (failed_ids if failures < MAX_SEND_FAILURES else [])
+    if retry_ids:
+        raise self.retry(
+            kwargs={
+                'task_ids': retry_ids,
+                'failures': failures + 1 if failed_ids else failures
+            },
+            countdown=_retry_countdown(failures, None if failed_ids else retry_after)
+        )
+    
+    return {
+        "status": "success",
+        "sent": len(sent_ids),
+        "failed": len(limited_ids) + len(failed_ids)
+    }
+
+
 @shared_task
 def check_task_deadlines():
     """
-    Периодическая задача для проверки дедлайнов задач.
-    Запускается каждые 5 минут через Celery Beat.
+    Reconciliation для уведомлений о дедлайнах.
+    Запускается раз в 30 минут через Celery Beat.
+    
+    Основная доставка идёт по ETA (schedule_task_notification), здесь
+    подбираются только задачи, чьё уведомление было потеряно или не отправлено.
+    Выбирает только окно deadline <= now + NOTIFICATION_WINDOW
+    по частичному индексу tasks_deadline_notify_idx, поэтому стоимость
+    зависит от числа задач с подходящим дедлайном, а не от размера таблицы.
+    Найденные задачи отправляются пачками по TELEGRAM_BATCH_SIZE.
+    
+    Задачам, чьё время уведомления вошло в NOTIFICATION_ETA_HORIZON,
+    ставится ETA-задание (если оно ещё не поставлено).
     """
     now = timezone.now()
     
+    upcoming = Task.objects.filter(
+        notification_sent=False,
+        status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
+        deadline__gt=now + Task.NOTIFICATION_WINDOW,
+        deadline__lte=now + Task.NOTIFICATION_WINDOW + NOTIFICATION_ETA_HORIZON
+    ).select_related('user').only(
+        'id', 'status', 'deadline', 'notification_sent', 'user__telegram_id'
+    ).order_by()
+    
+    scheduled_count = 0
+    for task in upcoming.iterator():
+        if not _notification_job_scheduled(task.id):
+            schedule_task_notification(task)
+            scheduled_count += 1
+    
     # Находим задачи которым нужно отправить уведомление
     tasks_to_notify = Task.objects.filter(
         notification_sent=False,
-        deadline__isnull=False,
-        status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS]
-    ).select_related('user')
+        status__in=[Task.Status.PENDING, Task.Status.IN_PROGRESS],
+        deadline__lte=now + Task.NOTIFICATION_WINDOW
+    ).order_by().values_list('id', flat=True)
     
     notified_count = 0
+    batch = []
+    
+    for task_id in tasks_to_notify.iterator():
+        batch.append(str(task_id))
+        if len(batch) >= settings.TELEGRAM_BATCH_SIZE:
+            send_task_notifications_batch.delay(task_ids=batch) #type: ignore
+            notified_count += len(batch)
+            batch = []
     
-    for task in tasks_to_notify:
-        if task.should_send_notification():
-            # Отправляем уведомление асинхронно
-            send_task_notification.delay(
-                task_id=str(task.id),
-                user_telegram_id=task.user.telegram_id
-            ) #type: ignore
-            notified_count += 1
+    if batch:
+        send_task_notifications_batch.delay(task_ids=batch) #type: ignore
+        notified_count += len(batch)
     
-    logger.info(f"🔔 Checked deadlines, sent {notified_count} notifications")
+    logger.info(
+        f"🔔 Checked deadlines, sent {notified_count} notifications, "
+        f"scheduled {scheduled_count}"
+    )
     
     return {
         "checked_at": now.isoformat(),
-        "notifications_sent": notified_count
+        "notifications_sent": notified_count,
+        "notifications_scheduled": scheduled_count
     }
 
 
-@shared_task
-def cleanup_old_completed_tasks(days: int = 30):
+def _delete_tasks_batch(task_ids: list) -> list:
+    """
+    Удалить пачку задач сырыми запросами, без загрузки строк в память
+    и без сигналов. То, что делали бы сигналы, делаем сами:
+    уменьшаем Category.tasks_count и возвращаем user_id для сброса статистики.
+    """
+    through = Task.categories.through._meta.db_table
+    categories = Category._meta.db_table
+    tasks = Task._meta.db_table
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {categories} AS c SET tasks_count = GREATEST(c.tasks_count - t.cnt, 0)
+            FROM (
+                SELECT category_id, COUNT(*) AS cnt FROM {through}
+                WHERE task_id = ANY(%s) GROUP BY category_id
+            ) AS t
+            WHERE c.id = t.category_id
+            """,
+            [task_ids]
+        )
+        cursor.execute(f"DELETE FROM {through} WHERE task_id = ANY(%s)", [task_ids])
+        cursor.execute(
+            f"DELETE FROM {tasks} WHERE id = ANY(%s) RETURNING user_id",
+            [task_ids]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _archive_tasks_batch(task_ids: list) -> list:
+    """Скопировать пачку задач и их связи в архив, затем удалить из tasks"""
+    tasks = Task._meta.db_table
+    through = Task.categories.through._meta.db_table
+    archive = ArchivedTask._meta.db_table
+    archive_through = ArchivedTask.categories.through._meta.db_table
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {archive}
+                (id, user_id, title, description, status, deadline,
+                 notification_sent, created_at, updated_at, archived_at)
+            SELECT id, user_id, title, description, status, deadline,
+                   notification_sent, created_at, updated_at, NOW()
+            FROM {tasks} WHERE id = ANY(%s)
+            ON CONFLICT (id) DO NOTHING
+            """,
+            [task_ids]
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {archive_through} (archivedtask_id, category_id)
+            SELECT task_id, category_id FROM {through} WHERE task_id = ANY(%s)
+            ON CONFLICT DO NOTHING
+            """,
+            [task_ids]
+        )
+    
+    return _delete_tasks_batch(task_ids)
+
+
+def _process_tasks_in_batches(job, queryset, handler, label: str) -> dict:
     """
-    Очистка старых выполненных задач.
-    Опционально: можно запускать раз в день через beat.
+    Обработать задачи из queryset пачками по CLEANUP_BATCH_SIZE.
+    
+    Идём в порядке ULID (keyset по первичному ключу): каждая пачка -
+    отдельная короткая транзакция, строки блокируются FOR UPDATE SKIP LOCKED,
+    handler(ids) выполняет сырые bulk-запросы и возвращает user_id
+    обработанных задач. Между пачками пауза, чтобы не мешать дневному трафику.
+    """
+    batch_size = settings.CLEANUP_BATCH_SIZE
+    started = time.monotonic()
+    
+    processed = 0
+    batches = 0
+    last_id = ''
+    
+    while True:
+        with transaction.atomic():
+            task_ids = list(
+                queryset.select_for_update(skip_locked=True)
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not task_ids:
+                break
+            
+            user_ids = handler(task_ids)
+        
+        for user_id in set(user_ids):
+            invalidate_task_stats(user_id)
+            bump_tasks_version(user_id)
+        # handler уменьшает Category.tasks_count
+        bump_category_counts_version()
+        
+        last_id = task_ids[-1]
+        processed += len(user_ids)
+        batches += 1
+        
+        logger.info(
+            f"🗑 {label} batch {batches}: {len(user_ids)} tasks "
+            f"(total {processed}, {time.monotonic() - started:.1f}s)"
+        )
+        if job.request.id:
+            job.update_state(
+                state='PROGRESS',
+                meta={'processed': processed, 'batches': batches}
+            )
+        
+        if len(task_ids) < batch_size:
+            break
+        time.sleep(settings.CLEANUP_BATCH_PAUSE)
+    
+    duration = time.monotonic() - started
+    logger.info(f"🗑 {label}: {processed} tasks in {batches} batches, {duration:.1f}s")
+    
+    return {
+        "processed": processed,
+        "batches": batches,
+        "duration": round(duration, 3),
+    }
+
+
+@shared_task(bind=True)
+def cleanup_old_completed_tasks(self, days: int = 30):
+    """
+    Безвозвратное удаление старых выполненных задач пачками.
+    По расписанию не запускается - старые задачи уходят в архив
+    (archive_old_tasks).
     
     Args:
         days: Удалять задачи старше N дней
     """
     cutoff_date = timezone.now() - timezone.timedelta(days=days)
     
-    deleted_count, _ = Task.objects.filter(
-        status=Task.Status.COMPLETED,
-        updated_at__lt=cutoff_date
-    ).delete()
+    result = _process_tasks_in_batches(
+        self,
+        Task.objects.filter(status=Task.Status.COMPLETED, updated_at__lt=cutoff_date),
+        _delete_tasks_batch,
+        'Cleanup'
+    )
+    
+    return {
+        "deleted_count": result['processed'],
+        "batches": result['batches'],
+        "duration": result['duration'],
+        "cutoff_date": cutoff_date.isoformat()
+    }
+
+
+@shared_task(bind=True)
+def archive_old_tasks(self, days: int = 30):
+    """
+    Перенос старых завершённых и отменённых задач в tasks_archive пачками.
+    
+    Args:
+        days: Архивировать задачи, не менявшиеся N дней
+    """
+    cutoff_date = timezone.now() - timezone.timedelta(days=days)
     
-    logger.info(f"🗑 Cleaned up {deleted_count} old completed tasks")
+    result = _process_tasks_in_batches(
+        self,
+        Task.objects.filter(
+            status__in=[Task.Status.COMPLETED, Task.Status.CANCELLED],
+            updated_at__lt=cutoff_date
+        ),
+        _archive_tasks_batch,
+        'Archive'
+    )
     
     return {
-        "deleted_count": deleted_count,
+        "archived_count": result['processed'],
+        "batches": result['batches'],
+        "duration": result['duration'],
         "cutoff_date": cutoff_date.isoformat()
-    }
\ No newline at end of file
+    }
+
+
+@shared_task
+def reconcile_category_tasks_count():
+    """
+    Сверка денормализованного Category.tasks_count с таблицей связей.
+    Счётчик поддерживается сигналами, но запись в обход ORM
+    (raw SQL, bulk-операции по through) может его рассинхронизировать.
+    
+    Обновление условное (compare-and-set по старому значению),
+    чтобы не затереть инкременты, случившиеся во время сверки.
+    """
+    drifted = Category.objects.annotate(
+        actual=Count('tasks')
+    ).exclude(tasks_count=F('actual')).values_list('id', 'tasks_count', 'actual')
+    
+    fixed = 0
+    for category_id, stored, actual in drifted:
+        fixed += Category.objects.filter(
+            pk=category_id, tasks_count=stored
+        ).update(tasks_count=actual)
+        logger.warning(f"⚠️ Category {category_id} tasks_count drift: {stored} -> {actual}")
+    
+    if fixed:
+        bump_category_counts_version()
+    logger.info(f"🔢 Reconciled tasks_count for {fixed} categories")
+    
+    return {"fixed": fixed}
+
+
+@shared_task
+def create_task_partitions():
+    """
+    Создать месячные партиции tasks на TASK_PARTITIONS_AHEAD месяцев вперёд.
+    Без партиции на текущий месяц вставка задач падает, поэтому запас
+    в несколько месяцев и ежедневный запуск.
+    """
+    created = ensure_task_partitions(settings.TASK_PARTITIONS_AHEAD)
+    
+    if created:
+        logger.info(f"🧩 Created task partitions: {', '.join(created)}")
+    
+    return {"created": created}
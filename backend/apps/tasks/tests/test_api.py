@@ -1,9 +1,11 @@
 import pytest
 from django.utils import timezone
 from datetime import timedelta
+from unittest.mock import patch
 from rest_framework import status
 
-from apps.tasks.models import Task, Category
+from apps.tasks.models import ArchivedTask, Task, Category
+from apps.tasks.tasks import _claim_notifications
 
 
 @pytest.mark.django_db
@@ -194,6 +196,106 @@ class TestTaskAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['count'] == 1
 
+    
+    def test_filter_tasks_by_multiple_statuses(self, authenticated_client, user):
+        """Тест фильтрации по нескольким статусам"""
+        Task.objects.create(user=user, title='Ожидает', status=Task.Status.PENDING)
+        Task.objects.create(user=user, title='В работе', status=Task.Status.IN_PROGRESS)
+        Task.objects.create(user=user, title='Завершена', status=Task.Status.COMPLETED)
+        Task.objects.create(user=user, title='Отменена', status=Task.Status.CANCELLED)
+        
+        response = authenticated_client.get('/api/tasks/my/?status=pending,in_progress')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2
+        
+        response = authenticated_client.get('/api/tasks/my/?status=-completed,-cancelled')
+        
+        assert response.data['count'] == 2
+        assert {t['status'] for t in response.data['results']} == {'pending', 'in_progress'}
+    
+    def test_filter_tasks_by_unknown_status(self, authenticated_client):
+        """Тест что неизвестный статус отклоняется"""
+        response = authenticated_client.get('/api/tasks/my/?status=pending,done')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_status_counts(self, authenticated_client, multiple_tasks):
+        """Тест счётчиков по статусам"""
+        response = authenticated_client.get('/api/tasks/my/?status=pending&counts=1')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 3
+        assert response.data['status_counts'] == {
+            'pending': 3,
+            'in_progress': 0,
+            'completed': 2,
+            'cancelled': 0,
+            'total': 5,
+        }
+    
+    def test_cursor_pagination(self, authenticated_client, user):
+        """Тест keyset-пагинации по ULID"""
+        for i in range(25):
+            Task.objects.create(user=user, title=f'Задача {i}')
+        
+        response = authenticated_client.get('/api/tasks/my/?pagination=cursor')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 20
+        assert response.data['next'] is not None
+        
+        first_page_ids = [t['id'] for t in response.data['results']]
+        assert first_page_ids == sorted(first_page_ids, reverse=True)
+        
+        response = authenticated_client.get(response.data['next'])
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 5
+        assert response.data['next'] is None
+        
+        second_page_ids = [t['id'] for t in response.data['results']]
+        assert max(second_page_ids) < min(first_page_ids)
+    
+    def test_cursor_pagination_page_size(self, authenticated_client, user):
+        """Тест размера страницы и ссылки назад в cursor-режиме"""
+        for i in range(12):
+            Task.objects.create(user=user, title=f'Задача {i}')
+        
+        first = authenticated_client.get('/api/tasks/my/?pagination=cursor&page_size=5')
+        assert len(first.data['results']) == 5
+        assert first.data['previous'] is None
+        
+        second = authenticated_client.get(first.data['next'])
+        assert len(second.data['results']) == 5
+        
+        back = authenticated_client.get(second.data['previous'])
+        assert [t['id'] for t in back.data['results']] == [t['id'] for t in first.data['results']]
+    
+    def test_cursor_pagination_keeps_filters(self, authenticated_client, multiple_tasks):
+        """Тест что cursor-режим сохраняет фильтр по статусу"""
+        response = authenticated_client.get('/api/tasks/my/?pagination=cursor&status=pending')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 3
+        assert all(t['status'] == 'pending' for t in response.data['results'])
+
+    
+    def test_created_range_filter(self, authenticated_client, user):
+        """Тест фильтра по дате создания (через диапазон ULID)"""
+        task = Task.objects.create(user=user, title='Сегодняшняя')
+        today = timezone.localdate().isoformat()
+        
+        response = authenticated_client.get('/api/tasks/', {'created_after': today})
+        assert [t['id'] for t in response.data['results']] == [task.id]
+        
+        response = authenticated_client.get('/api/tasks/', {'created_before': today})
+        assert response.data['count'] == 0
+        
+        response = authenticated_client.get('/api/tasks/', {'created_after': 'вчера'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 @pytest.mark.django_db
 class TestCategoryAPI:
@@ -238,6 +340,28 @@ class TestCategoryAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['color'] == '#FFFFFF'
     
+    def test_category_id_is_ulid_string(self, authenticated_client, category):
+        """Тест что бинарный ULID отдаётся строкой и находится в любом регистре"""
+        response = authenticated_client.get(f'/api/categories/{category.id.lower()}/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == category.id
+        assert len(response.data['id']) == 26
+    
+    def test_invalid_category_ids(self, authenticated_client):
+        """Тест что невалидный ULID категории - ошибка валидации, а не 500"""
+        response = authenticated_client.post('/api/tasks/', {
+            'title': 'Задача',
+            'category_ids': ['not-a-ulid']
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        response = authenticated_client.get('/api/tasks/my/', {'category': 'not-a-ulid'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        response = authenticated_client.get('/api/categories/not-a-ulid/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
     def test_delete_category(self, authenticated_client, category):
         """Тест удаления категории"""
         category_id = category.id
@@ -245,4 +369,399 @@ class TestCategoryAPI:
         response = authenticated_client.delete(f'/api/categories/{category_id}/')
         
         assert response.status_code == status.HTTP_204_NO_CONTENT
-        assert not Category.objects.filter(id=category_id).exists()
\ No newline at end of file
+        assert not Category.objects.filter(id=category_id).exists()
+
+
+@pytest.mark.django_db
+class TestTaskStatsAPI:
+    """Тесты для статистики задач"""
+    
+    def test_stats(self, authenticated_client, user, multiple_tasks):
+        """Тест подсчёта статистики"""
+        Task.objects.create(
+            user=user,
+            title='Просроченная',
+            deadline=timezone.now() - timedelta(days=1)
+        )
+        
+        response = authenticated_client.get('/api/tasks/stats/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['pending'] == 4
+        assert response.data['completed'] == 2
+        assert response.data['total'] == 6
+        assert response.data['overdue'] == 1
+    
+    def test_stats_cached_and_invalidated(self, authenticated_client, user, django_assert_num_queries,
+                                          django_capture_on_commit_callbacks):
+        """Тест что статистика кешируется и сбрасывается после коммита записи задачи"""
+        authenticated_client.get('/api/tasks/stats/')
+        
+        with django_assert_num_queries(0):
+            response = authenticated_client.get('/api/tasks/stats/')
+        assert response.data['total'] == 0
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.create(user=user, title='Новая')
+        
+        response = authenticated_client.get('/api/tasks/stats/')
+        assert response.data['total'] == 1
+
+
+@pytest.mark.django_db
+class TestTaskSearchAPI:
+    """Тесты полнотекстового поиска задач"""
+    
+    def test_search_ranks_title_first(self, authenticated_client, user):
+        """Тест что совпадение в названии выше совпадения в описании"""
+        Task.objects.create(user=user, title='Купить молоко', description='Отчёт лежит на столе')
+        Task.objects.create(user=user, title='Написать отчёт', description='Квартальный')
+        Task.objects.create(user=user, title='Позвонить маме')
+        
+        response = authenticated_client.get('/api/tasks/', {'search': 'отчёт'})
+        
+        assert response.status_code == status.HTTP_200_OK
+        titles = [task['title'] for task in response.data['results']]
+        assert titles == ['Написать отчёт', 'Купить молоко']
+    
+    def test_search_by_prefix_and_stem(self, authenticated_client, user):
+        """Тест поиска по началу слова и словоформе"""
+        Task.objects.create(user=user, title='Подготовить презентации')
+        
+        response = authenticated_client.get('/api/tasks/my/', {'search': 'презентация'})
+        assert response.data['count'] == 1
+        
+        response = authenticated_client.get('/api/tasks/my/', {'search': 'през', 'counts': 1})
+        assert response.data['count'] == 1
+        assert response.data['status_counts']['pending'] == 1
+    
+    def test_search_updated_on_write(self, authenticated_client, user):
+        """Тест что индекс обновляется при изменении задачи"""
+        task = Task.objects.create(user=user, title='Старое название')
+        
+        response = authenticated_client.patch(
+            f'/api/tasks/{task.id}/',
+            {'title': 'Новое название'},
+            format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+        
+        assert authenticated_client.get('/api/tasks/', {'search': 'старое'}).data['count'] == 0
+        assert authenticated_client.get('/api/tasks/', {'search': 'новое'}).data['count'] == 1
+    
+    def test_search_ignores_punctuation(self, authenticated_client, user):
+        """Тест что спецсимволы tsquery не ломают запрос"""
+        Task.objects.create(user=user, title='Задача')
+        
+        response = authenticated_client.get('/api/tasks/', {'search': "!:*&|'"})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 1
+
+
+@pytest.mark.django_db
+class TestTaskBulkAPI:
+    """Тесты массовых операций с задачами"""
+    
+    def test_bulk_create(self, authenticated_client, user, category, django_assert_max_num_queries):
+        """Тест массового создания задач с категориями"""
+        payload = {
+            'tasks': [
+                {'title': f'Задача {i}', 'category_ids': [category.id]}
+                for i in range(100)
+            ]
+        }
+        
+        with django_assert_max_num_queries(10):
+            response = authenticated_client.post('/api/tasks/bulk/', payload, format='json')
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 100
+        assert response.data['ids'] == sorted(response.data['ids'])
+        assert Task.objects.filter(user=user).count() == 100
+        assert category.tasks.count() == 100
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 100
+    
+    def test_bulk_create_is_atomic(self, authenticated_client, user):
+        """Тест что невалидный элемент отклоняет весь запрос"""
+        payload = {'tasks': [{'title': 'Нормальная'}, {'title': ''}]}
+        
+        response = authenticated_client.post('/api/tasks/bulk/', payload, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Task.objects.filter(user=user).exists()
+    
+    def test_bulk_create_limit(self, authenticated_client, settings):
+        """Тест ограничения размера запроса"""
+        settings.TASKS_BULK_MAX_ITEMS = 2
+        payload = {'tasks': [{'title': f'Задача {i}'} for i in range(3)]}
+        
+        response = authenticated_client.post('/api/tasks/bulk/', payload, format='json')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_bulk_status(self, authenticated_client, user, another_user, multiple_tasks):
+        """Тест массовой смены статуса"""
+        other_task = Task.objects.create(user=another_user, title='Чужая')
+        pending_ids = [t.id for t in multiple_tasks if t.status == Task.Status.PENDING]
+        
+        response = authenticated_client.post(
+            '/api/tasks/bulk_status/',
+            {'ids': pending_ids + [other_task.id], 'status': 'completed'},
+            format='json'
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == len(pending_ids)
+        assert response.data['not_found'] == [other_task.id]
+        assert not Task.objects.filter(user=user, status=Task.Status.PENDING).exists()
+        
+        other_task.refresh_from_db()
+        assert other_task.status == Task.Status.PENDING
+    
+    def test_bulk_status_rejects_malformed_ids(self, authenticated_client, task):
+        """Тест что некорректный id отклоняется, а не попадает в not_found"""
+        response = authenticated_client.post(
+            '/api/tasks/bulk_status/',
+            {'ids': [task.id, 'not-a-ulid'], 'status': 'completed'},
+            format='json'
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ids' in response.data
+        task.refresh_from_db()
+        assert task.status == Task.Status.PENDING
+    
+    def test_bulk_status_invalidates_stats(self, authenticated_client, task,
+                                          django_capture_on_commit_callbacks):
+        """Тест что статистика сбрасывается после массовой смены статуса"""
+        assert authenticated_client.get('/api/tasks/stats/').data['pending'] == 1
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.post(
+                '/api/tasks/bulk_status/',
+                {'ids': [task.id], 'status': 'completed'},
+                format='json'
+            )
+        
+        assert authenticated_client.get('/api/tasks/stats/').data['completed'] == 1
+    
+    def test_bulk_status_reopen_queries(self, authenticated_client, user,
+                                        django_assert_max_num_queries,
+                                        django_capture_on_commit_callbacks):
+        """Тест что перепланирование уведомлений не читает пользователя на каждую задачу"""
+        tasks = Task.objects.bulk_create([
+            Task(
+                user=user,
+                title=f'Задача {i}',
+                status=Task.Status.COMPLETED,
+                deadline=timezone.now() + timedelta(minutes=90)
+            )
+            for i in range(30)
+        ])
+        
+        with patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_assert_max_num_queries(10):
+                with django_capture_on_commit_callbacks(execute=True):
+                    response = authenticated_client.post(
+                        '/api/tasks/bulk_status/',
+                        {'ids': [task.id for task in tasks], 'status': 'pending'},
+                        format='json'
+                    )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 30
+        assert apply_async.call_count == 30
+        assert all(
+            call.kwargs['kwargs']['user_telegram_id'] == user.telegram_id
+            for call in apply_async.call_args_list
+        )
+
+
+@pytest.mark.django_db
+class TestArchivedTasksAPI:
+    """Тесты чтения архивных задач"""
+    
+    @pytest.fixture
+    def archived_task(self, user, category):
+        task = ArchivedTask.objects.create(
+            id='01ARZ3NDEKTSV4RRFFQ69G5FAV',
+            user=user,
+            title='Из архива',
+            status=Task.Status.COMPLETED,
+            created_at=timezone.now() - timedelta(days=60),
+            updated_at=timezone.now() - timedelta(days=40)
+        )
+        task.categories.add(category)
+        return task
+    
+    def test_archive_hidden_by_default(self, authenticated_client, task, archived_task):
+        """Тест что без флага архив не показывается"""
+        response = authenticated_client.get('/api/tasks/')
+        
+        assert [t['id'] for t in response.data['results']] == [task.id]
+    
+    def test_include_archived(self, authenticated_client, task, archived_task):
+        """Тест списка вместе с архивом, по дате создания"""
+        response = authenticated_client.get('/api/tasks/', {'include_archived': 1})
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2
+        results = response.data['results']
+        assert [t['id'] for t in results] == [task.id, archived_task.id]
+        assert results[1]['is_archived'] is True
+        assert results[1]['categories'][0]['name'] == 'Работа'
+    
+    def test_my_include_archived_with_filters(self, authenticated_client, task, archived_task):
+        """Тест что фильтры и счётчики /my/ учитывают архив"""
+        response = authenticated_client.get(
+            '/api/tasks/my/',
+            {'include_archived': 1, 'status': 'completed', 'counts': 1}
+        )
+        
+        assert [t['id'] for t in response.data['results']] == [archived_task.id]
+        assert response.data['status_counts']['completed'] == 1
+        assert response.data['status_counts']['total'] == 2
+    
+    def test_search_in_archive(self, authenticated_client, task, archived_task):
+        """Тест полнотекстового поиска по архиву"""
+        response = authenticated_client.get(
+            '/api/tasks/', {'include_archived': 1, 'search': 'архив'}
+        )
+        
+        assert [t['id'] for t in response.data['results']] == [archived_task.id]
+    
+    def test_include_archived_keeps_ordering(self, authenticated_client, task, archived_task):
+        """Тест что ?ordering= применяется к объединённому списку"""
+        response = authenticated_client.get(
+            '/api/tasks/', {'include_archived': 1, 'ordering': 'created_at'}
+        )
+        
+        assert [t['id'] for t in response.data['results']] == [archived_task.id, task.id]
+    
+    def test_include_archived_search_by_rank(self, authenticated_client, user, archived_task):
+        """Тест что поиск с архивом сортируется по релевантности, а не по дате"""
+        hot = Task.objects.create(user=user, title='Отчёт', description='Ссылка на архив')
+        ArchivedTask.objects.filter(pk=archived_task.pk).update(
+            title='Архив', description='Архив архив архив'
+        )
+        
+        response = authenticated_client.get(
+            '/api/tasks/', {'include_archived': 1, 'search': 'архив'}
+        )
+        
+        assert [t['id'] for t in response.data['results']] == [archived_task.id, hot.id]
+    
+    def test_include_archived_rejects_cursor(self, authenticated_client, archived_task):
+        """Тест что cursor-пагинация с архивом не поддерживается"""
+        response = authenticated_client.get(
+            '/api/tasks/my/',
+            {'include_archived': 1, 'pagination': 'cursor'}
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestConditionalGetAPI:
+    """Тесты ETag / If-None-Match"""
+    
+    def test_not_modified_without_queries(self, authenticated_client, multiple_tasks,
+                                          django_assert_num_queries):
+        """Тест что совпавший ETag отвечается 304 без запросов к задачам"""
+        response = authenticated_client.get('/api/tasks/my/')
+        etag = response['ETag']
+        
+        # Только проверка токена (из кеша) - задачи не читаются
+        with django_assert_num_queries(0):
+            response = authenticated_client.get('/api/tasks/my/', HTTP_IF_NONE_MATCH=etag)
+        
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+    
+    def test_etag_depends_on_query(self, authenticated_client, multiple_tasks):
+        """Тест что разные фильтры дают разные ETag"""
+        pending = authenticated_client.get('/api/tasks/my/', {'status': 'pending'})
+        completed = authenticated_client.get('/api/tasks/my/', {'status': 'completed'})
+        
+        assert pending['ETag'] != completed['ETag']
+        response = authenticated_client.get(
+            '/api/tasks/my/', {'status': 'completed'}, HTTP_IF_NONE_MATCH=pending['ETag']
+        )
+        assert response.status_code == status.HTTP_200_OK
+    
+    def test_etag_changes_on_task_write(self, authenticated_client, task,
+                                        django_capture_on_commit_callbacks):
+        """Тест что запись задачи меняет ETag"""
+        etag = authenticated_client.get('/api/tasks/').get('ETag')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            authenticated_client.patch(f'/api/tasks/{task.id}/', {'title': 'Новое'})
+        
+        response = authenticated_client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+    
+    def test_etag_per_user(self, api_client, authenticated_client, another_user, task,
+                           django_capture_on_commit_callbacks):
+        """Тест что задачи другого пользователя не меняют ETag"""
+        etag = authenticated_client.get('/api/tasks/').get('ETag')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Task.objects.create(user=another_user, title='Чужая')
+        
+        response = authenticated_client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    
+    def test_category_change_updates_task_etag(self, authenticated_client, task, category,
+                                               django_capture_on_commit_callbacks):
+        """Тест что переименование категории меняет ETag и категорий, и задач"""
+        tasks_etag = authenticated_client.get('/api/tasks/').get('ETag')
+        categories_etag = authenticated_client.get('/api/categories/').get('ETag')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            category.name = 'Учёба'
+            category.save()
+        
+        response = authenticated_client.get('/api/tasks/', HTTP_IF_NONE_MATCH=tasks_etag)
+        assert response.status_code == status.HTTP_200_OK
+        response = authenticated_client.get('/api/categories/', HTTP_IF_NONE_MATCH=categories_etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'][0]['name'] == 'Учёба'
+    
+    def test_foreign_category_links_keep_task_etag(self, authenticated_client, another_user,
+                                                   task, category,
+                                                   django_capture_on_commit_callbacks):
+        """Тест что чужие связи с категорией меняют ETag категорий, но не задач"""
+        tasks_etag = authenticated_client.get('/api/tasks/').get('ETag')
+        categories_etag = authenticated_client.get('/api/categories/').get('ETag')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            foreign = Task.objects.create(user=another_user, title='Чужая')
+            foreign.categories.add(category)
+            foreign.delete()
+        
+        response = authenticated_client.get('/api/tasks/', HTTP_IF_NONE_MATCH=tasks_etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        response = authenticated_client.get('/api/categories/', HTTP_IF_NONE_MATCH=categories_etag)
+        assert response.status_code == status.HTTP_200_OK
+    
+    def test_notification_claim_updates_task_etag(self, authenticated_client, user,
+                                                  django_capture_on_commit_callbacks):
+        """Тест что отметка notification_sent меняет ETag задач владельца"""
+        task = Task.objects.create(
+            user=user,
+            title='Скоро дедлайн',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+        etag = authenticated_client.get(f'/api/tasks/{task.id}/').get('ETag')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            assert _claim_notifications([task.id]) == [task.id]
+        
+        response = authenticated_client.get(f'/api/tasks/{task.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['notification_sent'] is True
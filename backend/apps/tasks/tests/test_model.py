@@ -1,8 +1,11 @@
 import pytest
+import re
+from django.db import connection
 from django.utils import timezone
 from datetime import timedelta
 
-from apps.tasks.models import Task, Category
+from apps.tasks.ids import generate_ulids
+from apps.tasks.models import Task, Category, assign_ulids
 from apps.users.models import User
 
 
@@ -43,6 +46,78 @@ class TestCategory:
         assert cat1.id < cat2.id  # cat1 создан раньше
         assert len(cat1.id) == 26
         assert cat1.id.isalnum()
+    
+    def test_tasks_count_follows_m2m(self, user):
+        """Тест что счётчик задач обновляется при изменении связей"""
+        work = Category.objects.create(name='Работа')
+        home = Category.objects.create(name='Дом')
+        task = Task.objects.create(user=user, title='Задача')
+        
+        task.categories.set([work, home])
+        work.refresh_from_db()
+        assert work.tasks_count == 1
+        
+        task.categories.set([home])
+        work.refresh_from_db()
+        home.refresh_from_db()
+        assert work.tasks_count == 0
+        assert home.tasks_count == 1
+        
+        other = Task.objects.create(user=user, title='Другая')
+        home.tasks.add(other)
+        home.refresh_from_db()
+        assert home.tasks_count == 2
+        
+        task.categories.clear()
+        home.refresh_from_db()
+        assert home.tasks_count == 1
+    
+    def test_tasks_count_on_task_delete(self, user, category):
+        """Тест что удаление задачи уменьшает счётчик"""
+        task = Task.objects.create(user=user, title='Задача')
+        task.categories.add(category)
+        
+        task.delete()
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 0
+    
+    def test_tasks_count_drift_does_not_go_negative(self, user, category):
+        """Тест что рассинхронный счётчик не уходит ниже нуля и не ломает запись"""
+        task = Task.objects.create(user=user, title='Задача')
+        task.categories.add(category)
+        Category.objects.filter(pk=category.pk).update(tasks_count=0)
+        
+        task.categories.remove(category)
+        task.categories.add(category)
+        category.tasks.clear()
+        task.categories.add(category)
+        task.delete()
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 0
+
+
+class TestULIDGeneration:
+    """Тесты монотонной генерации ULID"""
+    
+    def test_monotonic_within_millisecond(self):
+        """Тест что id, созданные подряд, строго возрастают"""
+        ids = generate_ulids(10000)
+        
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+        assert all(len(value) == 26 for value in ids)
+    
+    def test_assign_ulids(self):
+        """Тест назначения id до bulk_create с сохранением порядка"""
+        tasks = [Task(title=str(i)) for i in range(3)]
+        tasks.append(Task(id='01ARZ3NDEKTSV4RRFFQ69G5FAV', title='с id'))
+        
+        assign_ulids(tasks)
+        
+        assert tasks[0].id < tasks[1].id < tasks[2].id
+        assert tasks[3].id == '01ARZ3NDEKTSV4RRFFQ69G5FAV'
 
 
 @pytest.mark.django_db
@@ -164,6 +239,85 @@ class TestTask:
         assert task.updated_at > old_updated
 
 
+@pytest.mark.django_db
+class TestTaskQueryPlans:
+    """Тесты что горячие запросы списка задач идут по индексам"""
+    
+    @pytest.fixture(autouse=True)
+    def _tasks_with_stats(self, user, another_user):
+        # Планы выбираются по статистике: нужны данные и ANALYZE.
+        # Задачи user - десятая часть таблицы вперемешку с чужими
+        statuses = Task.Status.values
+        now = timezone.now()
+        tasks = [
+            Task(
+                user=user if i % 10 == 0 else another_user,
+                title=f'Задача {i}',
+                status=statuses[i // 10 % len(statuses)],
+                deadline=now + timedelta(days=i % 7 - 3) if i % 3 else None
+            )
+            for i in range(2000)
+        ]
+        Task.objects.bulk_create(assign_ulids(tasks))
+        
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE tasks')
+    
+    @staticmethod
+    def _index_names(name):
+        """
+        Имя индекса и имена его копий в партициях: на партиционированной
+        таблице (миграция 0007) план называет индексы партиций.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = %s::regclass
+                """,
+                [name]
+            )
+            return {name} | {row[0] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _scanned_indexes(plan):
+        return set(re.findall(r'Index(?: Only)? Scan(?: Backward)? using (\w+)', plan)) | set(
+            re.findall(r'Bitmap Index Scan on (\w+)', plan)
+        )
+    
+    def test_status_list_uses_covering_index(self, user):
+        """Тест что список по статусу с сортировкой идёт по составному индексу"""
+        plan = Task.objects.filter(
+            user=user, status='pending'
+        ).order_by('-created_at')[:20].explain()
+        
+        scanned = self._scanned_indexes(plan)
+        assert scanned
+        assert scanned <= self._index_names('tasks_user_status_created_idx')
+        assert 'Seq Scan' not in plan
+    
+    def test_multi_status_list_avoids_seqscan(self, user):
+        """Тест что фильтр по нескольким статусам не сканирует таблицу"""
+        plan = Task.objects.filter(
+            user=user, status__in=['pending', 'in_progress']
+        ).order_by('-created_at')[:20].explain()
+        
+        assert 'Seq Scan' not in plan
+    
+    def test_overdue_uses_partial_index(self, user):
+        """Тест что просроченные задачи ищутся по частичному индексу"""
+        plan = Task.objects.filter(
+            user=user,
+            deadline__lt=timezone.now(),
+            status__in=['pending', 'in_progress']
+        ).explain()
+        
+        scanned = self._scanned_indexes(plan)
+        assert scanned
+        assert scanned <= self._index_names('tasks_user_overdue_idx')
+
+
 @pytest.mark.django_db
 class TestUser:
     """Тесты для модели User"""
@@ -0,0 +1,615 @@
+import pytest
+import requests
+from django.db import connection
+from unittest.mock import Mock, patch
+from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
+from ulid import ULID
+
+from apps.tasks.models import ArchivedTask, Category, Task
+from apps.tasks.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    ensure_task_partitions,
+    get_partition_upper_bounds,
+    month_partition,
+    month_start
+)
+from apps.tasks.ratelimit import TelegramRateLimiter, TelegramRetryAfter
+from apps.tasks.tasks import (
+    MAX_SEND_FAILURES,
+    RATE_LIMIT_RETRY_MIN_DELAY,
+    archive_old_tasks,
+    _send_telegram_message,
+    check_task_deadlines,
+    cleanup_old_completed_tasks,
+    create_task_partitions,
+    _retry_countdown,
+    reconcile_category_tasks_count,
+    schedule_task_notification,
+    send_task_notification,
+    send_task_notifications_batch
+)
+
+
+@pytest.mark.django_db
+class TestCheckTaskDeadlines:
+    """Тесты для периодической проверки дедлайнов"""
+
+    def test_notifies_only_due_tasks(self, user):
+        """Тест что уведомления уходят только по задачам в окне дедлайна"""
+        due = Task.objects.create(
+            user=user,
+            title='Через 30 минут',
+            deadline=timezone.now() + timedelta(minutes=30)
+        )
+        overdue = Task.objects.create(
+            user=user,
+            title='Просроченная',
+            deadline=timezone.now() - timedelta(hours=1)
+        )
+        Task.objects.create(
+            user=user,
+            title='Через 2 часа',
+            deadline=timezone.now() + timedelta(hours=2)
+        )
+        Task.objects.create(user=user, title='Без дедлайна')
+        Task.objects.create(
+            user=user,
+            title='Уже отправлено',
+            deadline=timezone.now() + timedelta(minutes=30),
+            notification_sent=True
+        )
+        Task.objects.create(
+            user=user,
+            title='Завершённая',
+            deadline=timezone.now() + timedelta(minutes=30),
+            status=Task.Status.COMPLETED
+        )
+
+        with patch('apps.tasks.tasks.send_task_notifications_batch.delay') as delay:
+            result = check_task_deadlines()
+
+        assert result['notifications_sent'] == 2
+        delay.assert_called_once()
+        assert set(delay.call_args.kwargs['task_ids']) == {due.id, overdue.id}
+
+    def test_splits_into_batches(self, user, settings):
+        """Тест что найденные задачи отправляются пачками"""
+        settings.TELEGRAM_BATCH_SIZE = 2
+        for i in range(5):
+            Task.objects.create(
+                user=user,
+                title=f'Задача {i}',
+                deadline=timezone.now() + timedelta(minutes=10)
+            )
+
+        with patch('apps.tasks.tasks.send_task_notifications_batch.delay') as delay:
+            result = check_task_deadlines()
+
+        assert result['notifications_sent'] == 5
+        assert [len(call.kwargs['task_ids']) for call in delay.call_args_list] == [2, 2, 1]
+
+    def test_schedules_upcoming_once(self, user, django_capture_on_commit_callbacks):
+        """Тест что задачи, вошедшие в горизонт ETA, ставятся один раз"""
+        upcoming = Task.objects.create(
+            user=user,
+            title='Через 90 минут',
+            deadline=timezone.now() + timedelta(minutes=90)
+        )
+        Task.objects.create(
+            user=user,
+            title='Через день',
+            deadline=timezone.now() + timedelta(days=1)
+        )
+
+        with patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async, \
+                patch('apps.tasks.tasks.send_task_notifications_batch.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                first = check_task_deadlines()
+            with django_capture_on_commit_callbacks(execute=True):
+                second = check_task_deadlines()
+
+        delay.assert_not_called()
+        assert first['notifications_scheduled'] == 1
+        assert second['notifications_scheduled'] == 0
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['kwargs'] == {
+            'task_id': upcoming.id,
+            'user_telegram_id': user.telegram_id
+        }
+
+
+@pytest.mark.django_db
+class TestSendTaskNotificationsBatch:
+    """Тесты для пакетной отправки уведомлений"""
+
+    def test_sends_and_marks_due_tasks(self, user, category):
+        """Тест что пачка отправляется и помечается одним UPDATE"""
+        tasks = []
+        for i in range(3):
+            task = Task.objects.create(
+                user=user,
+                title=f'Задача {i}',
+                deadline=timezone.now() + timedelta(minutes=10)
+            )
+            task.categories.add(category)
+            tasks.append(task)
+        not_due = Task.objects.create(
+            user=user,
+            title='Через день',
+            deadline=timezone.now() + timedelta(days=1)
+        )
+
+        with patch('apps.tasks.tasks._send_telegram_message') as send:
+            result = send_task_notifications_batch.apply(
+                kwargs={'task_ids': [t.id for t in tasks] + [not_due.id]}
+            ).get()
+
+        assert result['sent'] == 3
+        assert send.call_count == 3
+        assert all(call.args[0] == user.telegram_id for call in send.call_args_list)
+        assert all(category.name in call.args[1] for call in send.call_args_list)
+        assert Task.objects.filter(notification_sent=True).count() == 3
+        not_due.refresh_from_db()
+        assert not_due.notification_sent is False
+
+    def test_failed_sends_are_released(self, user):
+        """Тест что неотправленные задачи снова доступны для отправки"""
+        task = Task.objects.create(
+            user=user,
+            title='Задача',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+
+        with patch(
+            'apps.tasks.tasks._send_telegram_message',
+            side_effect=requests.ConnectionError('boom')
+        ):
+            send_task_notifications_batch.apply(
+                kwargs={'task_ids': [task.id], 'failures': MAX_SEND_FAILURES}
+            )
+
+        task.refresh_from_db()
+        assert task.notification_sent is False
+
+    def test_unexpected_errors_release_claim(self, user):
+        """Тест что любая ошибка отправки или сборки сообщения снимает отметку"""
+        task = Task.objects.create(
+            user=user,
+            title='Задача',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+
+        with patch('apps.tasks.tasks._send_telegram_message', side_effect=KeyError('chat')):
+            send_task_notifications_batch.apply(
+                kwargs={'task_ids': [task.id], 'failures': MAX_SEND_FAILURES}
+            )
+
+        task.refresh_from_db()
+        assert task.notification_sent is False
+
+        with patch(
+            'apps.tasks.tasks._build_notification_message',
+            side_effect=ValueError('bad payload')
+        ):
+            result = send_task_notifications_batch.apply(kwargs={'task_ids': [task.id]})
+
+        assert result.failed()
+        task.refresh_from_db()
+        assert task.notification_sent is False
+
+    def test_rate_limit_waits_do_not_exhaust_retries(self, user, settings):
+        """Тест что долгий всплеск лимита не расходует бюджет ретраев пачки"""
+        task = Task.objects.create(
+            user=user,
+            title='Задача',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+        wait = settings.TELEGRAM_RATE_LIMIT_MAX_WAIT + 0.05
+        burst = [TelegramRetryAfter(wait)] * (MAX_SEND_FAILURES * 3)
+
+        with patch(
+            'apps.tasks.tasks._send_telegram_message',
+            side_effect=burst + [None]
+        ) as send:
+            result = send_task_notifications_batch.apply(kwargs={'task_ids': [task.id]})
+
+        assert result.get()['sent'] == 1
+        assert send.call_count == len(burst) + 1
+        task.refresh_from_db()
+        assert task.notification_sent is True
+
+
+@pytest.mark.django_db
+class TestNotificationScheduling:
+    """Тесты для планирования уведомлений по ETA"""
+
+    def test_create_schedules_notification(
+        self, authenticated_client, django_capture_on_commit_callbacks
+    ):
+        """Тест что создание задачи с дедлайном ставит уведомление на deadline - 1h"""
+        deadline = timezone.now() + timedelta(minutes=90)
+
+        with patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post('/api/tasks/', {
+                    'title': 'С дедлайном',
+                    'deadline': deadline.isoformat()
+                }, format='json')
+
+        assert response.status_code == 201
+        apply_async.assert_called_once()
+        eta = apply_async.call_args.kwargs['eta']
+        assert abs((deadline - Task.NOTIFICATION_WINDOW - eta).total_seconds()) < 1
+        assert apply_async.call_args.kwargs['kwargs']['task_id'] == response.data['id']
+
+    def test_far_deadline_is_left_to_reconciliation(
+        self, authenticated_client, django_capture_on_commit_callbacks
+    ):
+        """Тест что ETA дальше горизонта не ставится в брокер сразу"""
+        deadline = timezone.now() + timedelta(days=1)
+
+        with patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post('/api/tasks/', {
+                    'title': 'С дедлайном',
+                    'deadline': deadline.isoformat()
+                }, format='json')
+
+        assert response.status_code == 201
+        apply_async.assert_not_called()
+
+    def test_complete_revokes_notification(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """Тест что завершение задачи отменяет запланированное уведомление"""
+        task = Task.objects.create(
+            user=user,
+            title='С дедлайном',
+            deadline=timezone.now() + timedelta(minutes=90)
+        )
+        with patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                schedule_task_notification(task)
+        job_id = apply_async.call_args.kwargs['task_id']
+
+        with patch('apps.tasks.tasks.current_app.control.revoke') as revoke:
+            with django_capture_on_commit_callbacks(execute=True):
+                authenticated_client.post(f'/api/tasks/{task.id}/complete/')
+
+        revoke.assert_called_once()
+        assert task.id in revoke.call_args.args[0]
+        assert revoke.call_args.args[0] == job_id
+
+    def test_status_change_keeps_notification(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """Тест что смена pending -> in_progress не отзывает и не перепланирует уведомление"""
+        task = Task.objects.create(
+            user=user,
+            title='С дедлайном',
+            deadline=timezone.now() + timedelta(days=1)
+        )
+
+        with patch('apps.tasks.tasks.current_app.control.revoke') as revoke, \
+                patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.patch(
+                    f'/api/tasks/{task.id}/', {'status': 'in_progress'}, format='json'
+                )
+
+        assert response.status_code == 200
+        revoke.assert_not_called()
+        apply_async.assert_not_called()
+
+    def test_reopen_schedules_new_job_id(
+        self, authenticated_client, user, django_capture_on_commit_callbacks
+    ):
+        """Тест что возвращённая в работу задача получает новый id задания, а не отозванный"""
+        deadline = timezone.now() + timedelta(minutes=90)
+
+        with patch('apps.tasks.tasks.current_app.control.revoke') as revoke, \
+                patch('apps.tasks.tasks.send_task_notification.apply_async') as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post('/api/tasks/', {
+                    'title': 'С дедлайном',
+                    'deadline': deadline.isoformat()
+                }, format='json')
+            task_id = response.data['id']
+            with django_capture_on_commit_callbacks(execute=True):
+                authenticated_client.post(f'/api/tasks/{task_id}/complete/')
+            with django_capture_on_commit_callbacks(execute=True):
+                authenticated_client.patch(
+                    f'/api/tasks/{task_id}/', {'status': 'pending'}, format='json'
+                )
+
+        revoked = revoke.call_args.args[0]
+        scheduled = [call.kwargs['task_id'] for call in apply_async.call_args_list]
+        assert len(scheduled) == 2
+        assert scheduled[0] == revoked
+        assert scheduled[1] != revoked
+
+    def test_send_skips_not_due_task(self, user):
+        """Тест что устаревшее ETA-уведомление не отправляется"""
+        task = Task.objects.create(
+            user=user,
+            title='Дедлайн перенесён',
+            deadline=timezone.now() + timedelta(days=1)
+        )
+
+        with patch('apps.tasks.tasks._send_telegram_message') as post:
+            result = send_task_notification.apply(
+                kwargs={'task_id': task.id, 'user_telegram_id': user.telegram_id}
+            ).get()
+
+        assert result['status'] == 'skipped'
+        post.assert_not_called()
+        task.refresh_from_db()
+        assert task.notification_sent is False
+
+    def test_rate_limit_burst_is_delivered(self, user, settings):
+        """Тест что уведомление доходит после всплеска лимита в несколько max_wait"""
+        task = Task.objects.create(
+            user=user,
+            title='Задача',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+        wait = settings.TELEGRAM_RATE_LIMIT_MAX_WAIT + 0.05
+        burst = [TelegramRetryAfter(wait)] * (MAX_SEND_FAILURES * 3)
+
+        with patch('apps.tasks.tasks._send_telegram_message', side_effect=burst + [None]) as send:
+            result = send_task_notification.apply(
+                kwargs={'task_id': task.id, 'user_telegram_id': user.telegram_id}
+            )
+
+        assert result.get()['status'] == 'success'
+        assert send.call_count == len(burst) + 1
+        task.refresh_from_db()
+        assert task.notification_sent is True
+
+    def test_send_errors_are_bounded(self, user):
+        """Тест что ошибки отправки ретраятся не больше MAX_SEND_FAILURES раз"""
+        task = Task.objects.create(
+            user=user,
+            title='Задача',
+            deadline=timezone.now() + timedelta(minutes=10)
+        )
+
+        with patch(
+            'apps.tasks.tasks._send_telegram_message',
+            side_effect=requests.ConnectionError('boom')
+        ) as send:
+            result = send_task_notification.apply(
+                kwargs={'task_id': task.id, 'user_telegram_id': user.telegram_id}
+            )
+
+        assert result.failed()
+        assert send.call_count == MAX_SEND_FAILURES + 1
+        task.refresh_from_db()
+        assert task.notification_sent is False
+
+
+class TestTelegramRateLimit:
+    """Тесты для обработки лимитов Telegram"""
+
+    def test_429_blocks_limiter_and_raises_retry_after(self):
+        """Тест что 429 сохраняет retry_after в общем лимитере"""
+        limiter = Mock()
+        limiter.acquire.return_value = 0
+        response = Mock(status_code=429)
+        response.json.return_value = {
+            'ok': False,
+            'error_code': 429,
+            'parameters': {'retry_after': 7}
+        }
+
+        with patch('apps.tasks.tasks.get_telegram_rate_limiter', return_value=limiter), \
+                patch('apps.tasks.tasks._get_telegram_session') as session:
+            session.return_value.post.return_value = response
+            with pytest.raises(TelegramRetryAfter) as exc_info:
+                _send_telegram_message(123, 'text')
+
+        assert exc_info.value.retry_after == 7
+        limiter.block.assert_called_once_with(7)
+
+    def test_limiter_timeout_does_not_send(self):
+        """Тест что без токена от лимитера запрос не отправляется"""
+        limiter = Mock()
+        limiter.acquire.return_value = 2.5
+
+        with patch('apps.tasks.tasks.get_telegram_rate_limiter', return_value=limiter), \
+                patch('apps.tasks.tasks._get_telegram_session') as session:
+            with pytest.raises(TelegramRetryAfter):
+                _send_telegram_message(123, 'text')
+
+        session.return_value.post.assert_not_called()
+
+    def test_acquire_does_not_sleep_past_max_wait(self):
+        """Тест что долгое ожидание токена не держит worker, а возвращается вызывающему"""
+        client = Mock()
+        client.register_script.return_value = Mock(return_value=30000)
+        limiter = TelegramRateLimiter(client, global_rate=30, chat_rate=1, max_wait=2)
+
+        with patch('apps.tasks.ratelimit.time.sleep') as sleep:
+            assert limiter.acquire(123) == 30
+
+        sleep.assert_not_called()
+
+    def test_rate_limit_countdown_has_floor_and_jitter(self):
+        """Тест что короткое ожидание лимитера не превращается в мгновенный ретрай"""
+        countdowns = {_retry_countdown(0, 0.05) for _ in range(20)}
+
+        assert min(countdowns) >= RATE_LIMIT_RETRY_MIN_DELAY
+        assert max(countdowns) <= RATE_LIMIT_RETRY_MIN_DELAY * 1.5
+        assert len(countdowns) > 1
+
+
+@pytest.mark.django_db
+class TestReconcileCategoryTasksCount:
+    """Тесты сверки счётчиков задач в категориях"""
+    
+    def test_fixes_drift(self, task, category):
+        """Тест что рассинхронизированный счётчик исправляется"""
+        Category.objects.filter(pk=category.pk).update(tasks_count=5)
+        
+        result = reconcile_category_tasks_count()
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 1
+        assert result['fixed'] == 1
+    
+    def test_no_drift(self, task, category):
+        """Тест что корректные счётчики не трогаются"""
+        assert reconcile_category_tasks_count()['fixed'] == 0
+
+
+@pytest.mark.django_db
+class TestCleanupOldCompletedTasks:
+    """Тесты пакетной очистки старых выполненных задач"""
+    
+    def test_deletes_in_batches(self, user, category, settings):
+        """Тест что удаляются только старые выполненные задачи, пачками"""
+        settings.CLEANUP_BATCH_SIZE = 2
+        settings.CLEANUP_BATCH_PAUSE = 0
+        
+        old = []
+        for i in range(5):
+            task = Task.objects.create(user=user, title=f'Старая {i}', status=Task.Status.COMPLETED)
+            task.categories.add(category)
+            old.append(task.id)
+        fresh = Task.objects.create(user=user, title='Свежая', status=Task.Status.COMPLETED)
+        pending = Task.objects.create(user=user, title='Активная')
+        pending.categories.add(category)
+        Task.objects.filter(id__in=old + [pending.id]).update(
+            updated_at=timezone.now() - timedelta(days=31)
+        )
+        
+        result = cleanup_old_completed_tasks(days=30)
+        
+        assert result['deleted_count'] == 5
+        assert result['batches'] == 3
+        assert set(Task.objects.values_list('id', flat=True)) == {fresh.id, pending.id}
+        assert not Task.categories.through.objects.filter(task_id__in=old).exists()
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 1
+    
+    def test_nothing_to_delete(self, task):
+        """Тест пустого прогона"""
+        result = cleanup_old_completed_tasks(days=30)
+        
+        assert result['deleted_count'] == 0
+        assert result['batches'] == 0
+
+
+@pytest.mark.django_db
+class TestArchiveOldTasks:
+    """Тесты переноса старых задач в архив"""
+    
+    def test_moves_to_archive(self, user, category):
+        """Тест что старые завершённые и отменённые задачи уходят в архив со связями"""
+        done = Task.objects.create(user=user, title='Готово', status=Task.Status.COMPLETED)
+        done.categories.add(category)
+        cancelled = Task.objects.create(user=user, title='Отменено', status=Task.Status.CANCELLED)
+        pending = Task.objects.create(user=user, title='Активная')
+        Task.objects.update(updated_at=timezone.now() - timedelta(days=31))
+        
+        result = archive_old_tasks(days=30)
+        
+        assert result['archived_count'] == 2
+        assert list(Task.objects.values_list('id', flat=True)) == [pending.id]
+        
+        archived = ArchivedTask.objects.get(id=done.id)
+        assert archived.title == 'Готово'
+        assert archived.created_at == done.created_at
+        assert list(archived.categories.all()) == [category]
+        assert ArchivedTask.objects.filter(id=cancelled.id).exists()
+        
+        category.refresh_from_db()
+        assert category.tasks_count == 0
+
+
+class TestTaskPartitions:
+    """Тесты границ месячных партиций по ULID"""
+    
+    def test_month_partition_bounds(self):
+        """Тест что ULID, созданные в месяце, попадают в его диапазон"""
+        start = datetime(2026, 12, 1, tzinfo=dt_timezone.utc)
+        name, lower, upper = month_partition(start)
+        
+        assert name == 'tasks_p202612'
+        assert upper == month_partition(datetime(2027, 1, 1, tzinfo=dt_timezone.utc))[1]
+        
+        inside = str(ULID.from_datetime(datetime(2026, 12, 31, 23, 59, tzinfo=dt_timezone.utc)))
+        outside = str(ULID.from_datetime(datetime(2027, 1, 1, tzinfo=dt_timezone.utc)))
+        assert lower <= inside < upper
+        assert not outside < upper
+    
+    @pytest.mark.django_db
+    def test_covered_months_are_not_recreated(self):
+        """Тест что партиции, созданные миграцией, повторно не создаются"""
+        assert create_task_partitions() == {"created": []}
+    
+    @pytest.mark.django_db
+    def test_existing_partitions_are_not_reported(self):
+        """Тест что уже существующая партиция не попадает в список созданных"""
+        with connection.cursor() as cursor:
+            bounds = get_partition_upper_bounds(cursor)
+            month = month_start(ULID.from_str(max(bounds)).datetime)
+            name, lower, upper = month_partition(month)
+            cursor.execute(
+                f'CREATE TABLE "{name}" PARTITION OF tasks FOR VALUES FROM (%s) TO (%s)',
+                [lower, upper]
+            )
+        
+        # Границы прочитаны до создания партиции (параллельный запуск)
+        with patch('apps.tasks.partitions.get_partition_upper_bounds', return_value=bounds):
+            created = ensure_task_partitions(months_ahead=1, now=month)
+        
+        assert created == [month_partition(add_months(month, 1))[0]]
+    
+    @pytest.mark.django_db
+    def test_tasks_table_is_partitioned(self):
+        """Тест что миграции делают tasks партиционированной с legacy и DEFAULT партициями"""
+        with connection.cursor() as cursor:
+            bounds = get_partition_upper_bounds(cursor)
+            cursor.execute(
+                """
+                SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'tasks'::regclass
+                """
+            )
+            partitions = {row[0] for row in cursor.fetchall()}
+        
+        assert bounds
+        assert {'tasks_legacy', DEFAULT_PARTITION} <= partitions
+        next_month = add_months(month_start(timezone.now()), 1)
+        assert month_partition(next_month)[0] in partitions
+    
+    @pytest.mark.django_db
+    def test_task_outside_partitions_goes_to_default(self, user):
+        """Тест что задача с id вне созданных месяцев сохраняется в DEFAULT-партиции"""
+        far = datetime(2100, 1, 1, tzinfo=dt_timezone.utc)
+        task = Task.objects.create(id=str(ULID.from_datetime(far)), user=user, title='Из будущего')
+        
+        assert Task.objects.filter(id=task.id).exists()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM tasks WHERE id = %s', [task.id])
+            assert cursor.fetchone()[0] == DEFAULT_PARTITION
+    
+    @pytest.mark.django_db
+    def test_month_with_default_rows_is_skipped(self, user):
+        """Тест что месяц, чьи строки лежат в DEFAULT, пропускается, а следующие создаются"""
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            last = max(get_partition_upper_bounds(cursor))
+        month = month_start(ULID.from_str(last).datetime)
+        Task.objects.create(
+            id=str(ULID.from_datetime(month + timedelta(days=1))), user=user, title='Задача'
+        )
+        months_ahead = (month.year - now.year) * 12 + month.month - now.month + 1
+        
+        created = ensure_task_partitions(months_ahead, now=now)
+        
+        assert created == [month_partition(add_months(month, 1))[0]]
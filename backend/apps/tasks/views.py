@@ -1,43 +1,88 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Value
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 from logger_setup import logger
 
-from .models import Task, Category
+from .models import ArchivedTask, Task, Category
+from .etags import (
+    CATEGORIES_SCOPE,
+    CATEGORY_COUNTS_SCOPE,
+    ConditionalGetMixin,
+    bump_tasks_version,
+    get_versions,
+    tasks_scope
+)
+from .filters import TaskSearchFilter
+from .partitions import ulid_lower_bound
+from .tasks import reschedule_task_notification, revoke_task_notification
+from .stats import get_task_stats, invalidate_task_stats
 from .serializers import (
     TaskListSerializer,
     TaskDetailSerializer,
     TaskCreateSerializer,
-    CategorySerializer
+    TaskBulkCreateSerializer,
+    TaskBulkStatusSerializer,
+    CategorySerializer,
+    ULIDStringField
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+def parse_status_filter(value: str):
+    """
+    Разобрать ?status=pending,in_progress или ?status=-completed,-cancelled.
+    Возвращает (включаемые статусы, исключаемые статусы).
+    """
+    include, exclude = [], []
+    
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        target = exclude if item.startswith('-') else include
+        item = item.lstrip('-')
+        if item not in Task.Status.values:
+            raise ValidationError({'status': f'Unknown status: {item}'})
+        target.append(item)
+    
+    return include, exclude
+
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для категорий.
+    GET отвечает ETag по версии категорий (304 на If-None-Match).
     """
     
-    queryset = Category.objects.annotate(
-        tasks_count=Count('tasks')
-    ).all()
+    # tasks_count - денормализованная колонка с индексом, без JOIN по M2M
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     ordering_fields = ['name', 'created_at', 'tasks_count']
     ordering = ['name']
+    
+    def get_etag_parts(self):
+        return get_versions(CATEGORIES_SCOPE, CATEGORY_COUNTS_SCOPE)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для задач.
+    GET отвечает ETag по версии задач пользователя (304 на If-None-Match).
     """
     
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, TaskSearchFilter]
+    # Поля, входящие в Task.search_vector
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'deadline', 'status']
     ordering = ['-created_at']
@@ -45,11 +90,64 @@ class TaskViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Возвращаем только задачи текущего пользователя"""
         res = Task.objects.filter(
-            user=self.request.user
+            user=self.request.user, **self.get_created_range()
         ).select_related('user').prefetch_related('categories')
 
         return res
     
+    def get_etag_parts(self):
+        """
+        Версии задач пользователя и категорий (вложены в ответ).
+        is_overdue и stats зависят от времени, поэтому ETag
+        дополнительно меняется раз в TASKS_ETAG_WINDOW секунд.
+        """
+        versions = get_versions(tasks_scope(self.request.user.pk), CATEGORIES_SCOPE)
+        if versions is None:
+            return None
+        return [*versions, int(timezone.now().timestamp() // settings.TASKS_ETAG_WINDOW)]
+    
+    def get_archived_queryset(self):
+        """Архивные задачи текущего пользователя (tasks_archive)"""
+        return ArchivedTask.objects.filter(
+            user=self.request.user, **self.get_created_range()
+        ).select_related('user').prefetch_related('categories')
+    
+    def get_created_range(self):
+        """
+        ?created_after= / ?created_before= (дата или дата-время) как диапазон id.
+        ULID начинается с времени создания, поэтому условие по id
+        отсекает лишние месячные партиции tasks (partition pruning).
+        """
+        bounds = {}
+        for param, lookup in (('created_after', 'id__gte'), ('created_before', 'id__lt')):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            moment = parse_datetime(value)
+            if moment is None:
+                day = parse_date(value)
+                if day is None:
+                    raise ValidationError({param: f'Invalid date: {value}'})
+                moment = datetime.combine(day, time.min)
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            bounds[lookup] = ulid_lower_bound(moment)
+        return bounds
+    
+    def include_archived(self):
+        """Запрошены ли архивные задачи (?include_archived=1)"""
+        return self.request.query_params.get('include_archived') in ('1', 'true')
+    
+    def list(self, request, *args, **kwargs):
+        """GET /api/tasks/ (?include_archived=1 - вместе с архивом)"""
+        if not self.include_archived():
+            return super().list(request, *args, **kwargs)
+        
+        return self._list_with_archive(
+            self.filter_queryset(self.get_queryset()),
+            self.filter_queryset(self.get_archived_queryset())
+        )
+    
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от действия"""
         if self.action == 'list':
@@ -62,6 +160,11 @@ class TaskViewSet(viewsets.ModelViewSet):
         """При создании автоматически назначаем текущего пользователя"""
         serializer.save(user=self.request.user)
     
+    def perform_destroy(self, instance):
+        """При удалении снимаем запланированное уведомление"""
+        revoke_task_notification(instance.id)
+        instance.delete()
+    
     def create(self, request, *args, **kwargs):
         """
         Переопределяем create чтобы возвращать детальный serializer
@@ -86,35 +189,139 @@ class TaskViewSet(viewsets.ModelViewSet):
         """
         GET /api/tasks/my/
         Альтернативный эндпоинт для получения задач пользователя
+
+        ?status=pending,in_progress - фильтр по одному или нескольким статусам
+        ?status=-completed,-cancelled - исключающий фильтр
+        ?category=<id> - фильтр по категории
+        ?counts=1 - добавить в ответ status_counts (один GROUP BY запрос)
+        ?pagination=cursor - keyset-пагинация по ULID (см. ULIDPagination)
+        ?include_archived=1 - вместе с задачами из архива (без cursor-пагинации)
         """
-        queryset = self.filter_queryset(self.get_queryset())
+        querysets = [self.filter_queryset(self.get_queryset())]
+        if self.include_archived():
+            querysets.append(self.filter_queryset(self.get_archived_queryset()))
+        
+        # Фильтрация по категории
+        category_id = request.query_params.get('category')
+        if category_id:
+            category_id = ULIDStringField().run_validation(category_id)
+            querysets = [qs.filter(categories__id=category_id) for qs in querysets]
+        
+        # Счётчики считаем до фильтра по статусу
+        status_counts = None
+        if request.query_params.get('counts') in ('1', 'true'):
+            status_counts = self._status_counts(*querysets)
 
         # Фильтрация по статусу
         status_filter = request.query_params.get('status')
         if status_filter:
-            if status_filter.startswith('-'):
-                # Исключающий фильтр: ?status=-completed
-                status_to_exclude = status_filter[1:]
-                logger.info(f"Excluding status: {status_to_exclude}")
-                queryset = queryset.exclude(status=status_to_exclude)
-            else:
-                # Обычный фильтр: ?status=pending
-                logger.info(f"Filtering by status: {status_filter}")
-                queryset = queryset.filter(status=status_filter)
+            include, exclude = parse_status_filter(status_filter)
+            if include:
+                logger.info(f"Filtering by status: {include}")
+                querysets = [qs.filter(status__in=include) for qs in querysets]
+            if exclude:
+                logger.info(f"Excluding status: {exclude}")
+                querysets = [qs.exclude(status__in=exclude) for qs in querysets]
         
-        # Фильтрация по категории
-        category_id = request.query_params.get('category')
-        if category_id:
-            queryset = queryset.filter(categories__id=category_id)
+        if len(querysets) > 1:
+            response = self._list_with_archive(*querysets)
+            if status_counts is not None:
+                response.data['status_counts'] = status_counts
+            return response
         
+        queryset = querysets[0]
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            if status_counts is not None:
+                response.data['status_counts'] = status_counts
+            return response
         
         serializer = self.get_serializer(queryset, many=True)
+        if status_counts is not None:
+            return Response({'results': serializer.data, 'status_counts': status_counts})
         return Response(serializer.data)
     
+    @staticmethod
+    def _status_counts(*querysets):
+        """Количество задач по статусам (один GROUP BY запрос на таблицу)"""
+        counts = {value: 0 for value in Task.Status.values}
+        
+        for queryset in querysets:
+            rows = queryset.select_related(None).prefetch_related(None).order_by().values(
+                'status'
+            ).annotate(count=Count('id'))
+            for row in rows:
+                counts[row['status']] += row['count']
+        
+        counts['total'] = sum(counts.values())
+        return counts
+    
+    def _list_with_archive(self, queryset, archived):
+        """
+        Список горячих и архивных задач вместе.
+        
+        UNION ALL выбирает только ключи (id и колонки сортировки), сортирует
+        и пагинирует; целиком загружается только текущая страница.
+        Сортировка берётся из отфильтрованного queryset: ?ordering=
+        или релевантность ?search= (search_rank), иначе -created_at.
+        Cursor-пагинация здесь не поддерживается.
+        """
+        if self.paginator is not None and self.paginator.use_cursor(self.request):
+            raise ValidationError({
+                'include_archived': 'Not supported with cursor pagination'
+            })
+        
+        ordering = list(queryset.query.order_by or self.ordering)
+        if not {'id', '-id'} & set(ordering):
+            ordering.append('-id')
+        columns = list(dict.fromkeys(
+            field.lstrip('-') for field in ordering if field.lstrip('-') != 'id'
+        ))
+        
+        keys = queryset.order_by().annotate(archived=Value(False)).values_list(
+            'id', 'archived', *columns
+        ).union(
+            archived.order_by().annotate(archived=Value(True)).values_list(
+                'id', 'archived', *columns
+            ),
+            all=True
+        ).order_by(*ordering)
+        
+        page = self.paginate_queryset(keys)
+        rows = [(row[0], row[1]) for row in (page if page is not None else keys)]
+        
+        hot_ids = [task_id for task_id, is_archived in rows if not is_archived]
+        archived_ids = [task_id for task_id, is_archived in rows if is_archived]
+        loaded = {
+            (False, task.id): task
+            for task in self.get_queryset().filter(id__in=hot_ids)
+        }
+        loaded.update({
+            (True, task.id): task
+            for task in self.get_archived_queryset().filter(id__in=archived_ids)
+        })
+        tasks = [
+            loaded[(is_archived, task_id)]
+            for task_id, is_archived in rows
+            if (is_archived, task_id) in loaded
+        ]
+        
+        serializer = self.get_serializer(tasks, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        GET /api/tasks/stats/
+        Количество задач по статусам, просроченные и на сегодня.
+        Кешируется per-user, сбрасывается при записи задач.
+        """
+        return Response(get_task_stats(request.user))
+    
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """
@@ -135,6 +342,61 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = TaskListSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /api/tasks/bulk/
+        Массовое создание: {"tasks": [{"title": ..., "category_ids": [...]}, ...]}
+        Всё или ничего: ошибка в любом элементе отклоняет весь запрос.
+        """
+        serializer = TaskBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save(user=request.user)
+        
+        return Response(
+            {'created': len(tasks), 'ids': [task.id for task in tasks]},
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """
+        POST /api/tasks/bulk_status/
+        Массовая смена статуса: {"ids": [...], "status": "completed"}
+        Чужие и несуществующие id возвращаются в not_found.
+        """
+        serializer = TaskBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        new_status = serializer.validated_data['status']
+        
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.filter(user=request.user, id__in=ids)
+                .select_related('user')
+                .select_for_update(of=('self',))
+                .only('id', 'status', 'deadline', 'notification_sent', 'user__telegram_id')
+            )
+            changed = [task for task in tasks if task.status != new_status]
+            
+            Task.objects.filter(id__in=[task.id for task in changed]).update(
+                status=new_status,
+                updated_at=timezone.now()
+            )
+            
+            # update() не шлёт post_save - сбрасываем кеш и уведомления сами
+            invalidate_task_stats(request.user.pk)
+            bump_tasks_version(request.user.pk)
+            for task in changed:
+                old_status, task.status = task.status, new_status
+                reschedule_task_notification(task, old_status, task.deadline)
+        
+        found = {task.id for task in tasks}
+        return Response({
+            'updated': len(changed),
+            'not_found': [task_id for task_id in ids if task_id not in found]
+        })
+    
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """
@@ -144,6 +406,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         task.status = Task.Status.COMPLETED
         task.save()
+        revoke_task_notification(task.id)
         
         serializer = TaskDetailSerializer(task)
         return Response(serializer.data)
@@ -157,6 +420,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         task.status = Task.Status.CANCELLED
         task.save()
+        revoke_task_notification(task.id)
         
         serializer = TaskDetailSerializer(task)
         return Response(serializer.data)
\ No newline at end of file
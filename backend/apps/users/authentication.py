@@ -0,0 +1,117 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    Двухуровневый кеш токенов: token key -> Token (с загруженным user).
+
+    1. LRU в памяти процесса - короткий TTL, т.к. инвалидация
+       из других процессов до него не доходит.
+    2. Django cache (Redis) - общий для всех процессов, инвалидируется
+       сигналами при logout (удаление токена) и сохранении пользователя.
+    """
+
+    key_prefix = 'auth:token:'
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def get(self, key: str):
+        """Получить токен из кеша или None"""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                token, expires_at = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    return copy.deepcopy(token)
+                del self._local[key]
+
+        try:
+            token = cache.get(self._cache_key(key))
+        except Exception as e:
+            logger.warning(f"⚠️ Token cache unavailable: {e}")
+            return None
+
+        if token is not None:
+            self._set_local(key, token)
+            return copy.deepcopy(token)
+
+        return None
+
+    def set(self, key: str, token):
+        """Положить токен в оба уровня кеша"""
+        self._set_local(key, token)
+        try:
+            cache.set(self._cache_key(key), token, settings.AUTH_TOKEN_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"⚠️ Token cache unavailable: {e}")
+
+    def invalidate(self, key: str):
+        """Удалить токен из кеша"""
+        with self._lock:
+            self._local.pop(key, None)
+        try:
+            cache.delete(self._cache_key(key))
+        except Exception as e:
+            logger.warning(f"⚠️ Token cache unavailable: {e}")
+
+    def clear_local(self):
+        """Очистить LRU текущего процесса"""
+        with self._lock:
+            self._local.clear()
+
+    def _set_local(self, key: str, token):
+        expires_at = time.monotonic() + settings.AUTH_TOKEN_LOCAL_CACHE_TTL
+
+        with self._lock:
+            self._local[key] = (token, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > settings.AUTH_TOKEN_LOCAL_CACHE_SIZE:
+                self._local.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кешем.
+
+    Убирает запрос к authtoken_token + users из каждого API вызова бота.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            token_cache.set(key, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
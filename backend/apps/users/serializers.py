@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
 from .models import User
+from apps.tasks.stats import get_task_stats
 
 
 class TelegramAuthSerializer(serializers.Serializer):
@@ -75,4 +76,4 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'date_joined']
     
     def get_tasks_count(self, obj):
-        return obj.tasks.count()
\ No newline at end of file
+        return get_task_stats(obj)['total']
\ No newline at end of file
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Logout (удаление токена) - токен больше не должен приниматься"""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Изменение пользователя (is_active, имя и т.д.) - сбросить закешированную копию"""
+    if created:
+        return
+
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_cache.invalidate(key)
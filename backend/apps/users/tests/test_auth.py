@@ -97,4 +97,34 @@ class TestTelegramAuth:
         """Тест выхода без аутентификации"""
         response = api_client.post('/api/auth/logout/')
         
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
\ No newline at end of file
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_token_auth_is_cached(self, authenticated_client, django_assert_num_queries):
+        """Тест что повторный запрос не ходит в БД за токеном"""
+        authenticated_client.get('/api/tasks/')
+        
+        # Остаётся только COUNT пустого списка задач
+        with django_assert_num_queries(1):
+            response = authenticated_client.get('/api/tasks/')
+        
+        assert response.status_code == status.HTTP_200_OK
+    
+    def test_logout_invalidates_cached_token(self, authenticated_client):
+        """Тест что после logout закешированный токен не принимается"""
+        authenticated_client.get('/api/auth/me/')
+        
+        response = authenticated_client.post('/api/auth/logout/')
+        assert response.status_code == status.HTTP_200_OK
+        
+        response = authenticated_client.get('/api/auth/me/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    def test_inactive_user_cache_invalidated(self, authenticated_client, user):
+        """Тест что деактивация пользователя сбрасывает кеш"""
+        authenticated_client.get('/api/auth/me/')
+        
+        user.is_active = False
+        user.save()
+        
+        response = authenticated_client.get('/api/auth/me/')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -14,15 +14,27 @@ app.conf.broker_connection_retry_on_startup = True
 
 # Расписание периодических задач
 app.conf.beat_schedule = {
+    # Уведомления уходят по ETA, beat только подбирает потерянные
     'check-task-deadlines': {
         'task': 'apps.tasks.tasks.check_task_deadlines',
-        'schedule': crontab(minute='*/5'),
+        'schedule': crontab(minute='*/30'),
     },
-    'cleanup-old-tasks': {
-        'task': 'apps.tasks.tasks.cleanup_old_completed_tasks',
+    # Старые завершённые/отменённые задачи переносятся в tasks_archive
+    'archive-old-tasks': {
+        'task': 'apps.tasks.tasks.archive_old_tasks',
         'schedule': crontab(hour=3, minute=0),
         'kwargs': {'days': 30}
     },
+    # Месячные партиции tasks создаются заранее
+    'create-task-partitions': {
+        'task': 'apps.tasks.tasks.create_task_partitions',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    # Сверка денормализованных счётчиков задач в категориях
+    'reconcile-category-tasks-count': {
+        'task': 'apps.tasks.tasks.reconcile_category_tasks_count',
+        'schedule': crontab(hour=4, minute=0),
+    },
 }
 
 # Брать из settings?
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -149,12 +150,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.tasks.pagination.ULIDPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
@@ -178,10 +179,54 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
+# Неподтверждённые задания Redis переотдаёт через visibility_timeout (по умолчанию 1 час).
+# ETA-уведомления ставятся не дальше NOTIFICATION_ETA_HORIZON (45 минут) вперёд
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 2 * 60 * 60}
+
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_REDIS_URL', REDIS_URL),
+    }
+}
+
+# Кеш токенов DRF: TTL в Redis и в LRU процесса (секунды), размер LRU
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+AUTH_TOKEN_LOCAL_CACHE_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_CACHE_TTL', 10))
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_LOCAL_CACHE_SIZE', 1024))
+
+# Ночная очистка: задач в одной транзакции и пауза между пачками (секунды)
+CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', 1000))
+CLEANUP_BATCH_PAUSE = float(os.getenv('CLEANUP_BATCH_PAUSE', 0.1))
+
+# Сколько месячных партиций tasks держать созданными наперёд
+TASK_PARTITIONS_AHEAD = int(os.getenv('TASK_PARTITIONS_AHEAD', 3))
+
+# Максимум задач в одном запросе /api/tasks/bulk/ и /api/tasks/bulk_status/
+TASKS_BULK_MAX_ITEMS = int(os.getenv('TASKS_BULK_MAX_ITEMS', 500))
+
+# Кеш /api/tasks/stats/ (секунды): ограничивает устаревание overdue/due_today
+TASK_STATS_CACHE_TTL = int(os.getenv('TASK_STATS_CACHE_TTL', 60))
+
+# ETag ответов /api/tasks/ меняется не реже раза в окно (секунды): is_overdue зависит от времени
+TASKS_ETAG_WINDOW = int(os.getenv('TASKS_ETAG_WINDOW', 60))
 
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 
+# Рассылка уведомлений: размер пачки и число параллельных запросов к Bot API
+TELEGRAM_BATCH_SIZE = int(os.getenv('TELEGRAM_BATCH_SIZE', 100))
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv('TELEGRAM_SEND_CONCURRENCY', 16))
+
+# Лимиты Bot API (сообщений в секунду): общий на бота и на один чат
+TELEGRAM_GLOBAL_RATE_LIMIT = float(os.getenv('TELEGRAM_GLOBAL_RATE_LIMIT', 30))
+TELEGRAM_CHAT_RATE_LIMIT = float(os.getenv('TELEGRAM_CHAT_RATE_LIMIT', 1))
+# Дольше worker токен не ждёт: задача уходит в ретрай по countdown
+TELEGRAM_RATE_LIMIT_MAX_WAIT = float(os.getenv('TELEGRAM_RATE_LIMIT_MAX_WAIT', 2))
+
 
 LOGGING = {
     'version': 1,
@@ -1,12 +1,27 @@
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
 
+from apps.users.authentication import token_cache
 from apps.users.models import User
 from apps.tasks.models import Task, Category
 
 
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Тесты не зависят от Redis: кеш в памяти процесса"""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    yield
+    cache.clear()
+    token_cache.clear_local()
+
+
 @pytest.fixture
 def api_client():
     """Фикстура для API клиента"""
@@ -10,12 +10,41 @@ class BotConfig:
     """Конфигурация бота"""
     token: str
     api_base_url: str
+    # memory:// | redis://host:port/db | sqlite:///tokens.db
+    token_storage_url: str = 'memory://'
+    token_ttl: int = 30 * 24 * 3600
+    # Read-through кеш APIClient (категории, детали задач): TTL в секундах, 0 - выключен
+    api_cache_ttl: int = 30
+    api_cache_size: int = 1000
+    # Пул соединений к backend'у и таймауты запросов (секунды)
+    api_pool_size: int = 100
+    api_timeout: float = 10
+    api_connect_timeout: float = 3
+    api_keepalive_timeout: float = 30
+    # Повторы GET при недоступности backend'а, hedged get_tasks (0 - выключено),
+    # circuit breaker: сбоев подряд до размыкания и пауза до пробного запроса
+    api_max_retries: int = 3
+    api_hedge_delay: float = 0
+    api_breaker_threshold: int = 5
+    api_breaker_reset_timeout: float = 5
     
     @classmethod
     def from_env(cls):
         return cls(
             token=os.getenv('TELEGRAM_BOT_TOKEN', ''),
-            api_base_url=os.getenv('API_BASE_URL', 'http://localhost:8000/api')
+            api_base_url=os.getenv('API_BASE_URL', 'http://localhost:8000/api'),
+            token_storage_url=os.getenv('TOKEN_STORAGE_URL', 'memory://'),
+            token_ttl=int(os.getenv('TOKEN_TTL', 30 * 24 * 3600)),
+            api_cache_ttl=int(os.getenv('API_CACHE_TTL', 30)),
+            api_cache_size=int(os.getenv('API_CACHE_SIZE', 1000)),
+            api_pool_size=int(os.getenv('API_POOL_SIZE', 100)),
+            api_timeout=float(os.getenv('API_TIMEOUT', 10)),
+            api_connect_timeout=float(os.getenv('API_CONNECT_TIMEOUT', 3)),
+            api_keepalive_timeout=float(os.getenv('API_KEEPALIVE_TIMEOUT', 30)),
+            api_max_retries=int(os.getenv('API_MAX_RETRIES', 3)),
+            api_hedge_delay=float(os.getenv('API_HEDGE_DELAY', 0)),
+            api_breaker_threshold=int(os.getenv('API_BREAKER_THRESHOLD', 5)),
+            api_breaker_reset_timeout=float(os.getenv('API_BREAKER_RESET_TIMEOUT', 5))
         )
 
 
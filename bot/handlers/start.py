@@ -1,3 +1,5 @@
+import asyncio
+
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
@@ -12,7 +14,10 @@ router = Router()
 async def cmd_start(message: Message, token: str, api_client: APIClient):
     """Команда /start"""
     try:
-        user_info = await api_client.get_current_user(token)
+        user_info, stats = await asyncio.gather(
+            api_client.get_current_user(token),
+            api_client.get_task_stats(token)
+        )
         
         kb = ReplyKeyboardBuilder()
         kb.button(text="📋 Мои задачи")
@@ -24,6 +29,9 @@ async def cmd_start(message: Message, token: str, api_client: APIClient):
         await message.answer(
             f"👋 Привет, {user_info.get('first_name', 'пользователь')}!\n\n"
             f"Это ToDo бот для управления задачами.\n\n"
+            f"⏳ Активных: {stats['pending'] + stats['in_progress']}\n"
+            f"📅 На сегодня: {stats['due_today']}\n"
+            f"⚠️ Просроченных: {stats['overdue']}\n\n"
             f"Используй кнопки меню или команды:\n"
             f"/tasks - список задач\n"
             f"/create - создать задачу\n"
@@ -45,6 +53,7 @@ async def cmd_help(message: Message):
 /create - Создать задачу
 /categories - Управление категориями
 /overdue - Просроченные задачи
+/find &lt;текст&gt; - Поиск задач
 
 <b>Кнопки:</b>
 📋 Мои задачи - показать все задачи
@@ -1,22 +1,43 @@
+from html import escape
+from typing import Any, Dict, List, Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.filters import Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from services.api_client import APIClient, APIError
+from services.api_client import APIClient, APIError, TasksPage
+from services.sender import send_many
 
 router = Router()
 
+ACTIVE_STATUSES = ['pending', 'in_progress']
+
+STATUS_EMOJI = {
+    'pending': '⏳',
+    'in_progress': '🔄',
+    'completed': '✅',
+    'cancelled': '❌'
+}
+
+# Компактный список: задач на странице одного сообщения, кнопок в ряду
+LIST_PAGE_SIZE = 10
+LIST_ROW_SIZE = 5
+
+# Telegram ограничивает callback_data 64 байтами
+CALLBACK_DATA_LIMIT = 64
+
+# Коды списков в callback_data: a - активные, c - завершённые, o - просроченные
+TASK_LIST_TITLES = {
+    'a': "⏳ <b>Активные задачи</b>",
+    'c': "✅ <b>Завершённые задачи</b>",
+    'o': "⚠️ <b>Просроченные задачи</b>",
+}
+
 
 def format_task(task: dict) -> str:
     """Форматировать задачу для отображения"""
-    status_emoji = {
-        'pending': '⏳',
-        'in_progress': '🔄',
-        'completed': '✅',
-        'cancelled': '❌'
-    }
-    
     status_names = {
         'pending': 'Ожидает',
         'in_progress': 'В работе',
@@ -24,7 +45,7 @@ def format_task(task: dict) -> str:
         'cancelled': 'Отменена'
     }
     
-    emoji = status_emoji.get(task['status'], '❓')
+    emoji = STATUS_EMOJI.get(task['status'], '❓')
     status_name = status_names.get(task['status'], task['status'])
     
     text = f"{emoji} <b>{task['title']}</b>\n"
@@ -81,56 +102,136 @@ def get_task_keyboard(task: dict) -> InlineKeyboardBuilder:
     return kb
 
 
+def format_task_line(number: int, task: dict) -> str:
+    """Задача одной строкой для компактного списка"""
+    line = f"{number}. {STATUS_EMOJI.get(task['status'], '❓')} {escape(task['title'])}"
+    if task.get('deadline'):
+        line += f" · ⏰ {task['deadline'][5:16].replace('T', ' ')}"
+    if task.get('is_overdue'):
+        line += " ⚠️"
+    return line
+
+
+async def load_task_page(
+    kind: str,
+    token: str,
+    api_client: APIClient,
+    cursor: Optional[str] = None,
+    with_counts: bool = False
+) -> TasksPage:
+    """Одна страница списка kind (a/c/o) по курсору keyset-пагинации"""
+    if kind == 'o':
+        return await api_client.get_overdue_page(token, cursor, page_size=LIST_PAGE_SIZE)
+    status = ACTIVE_STATUSES if kind == 'a' else 'completed'
+    return await api_client.get_tasks_page(
+        token, status=status, cursor=cursor,
+        with_counts=with_counts, page_size=LIST_PAGE_SIZE
+    )
+
+
+def _card_buttons(kb: InlineKeyboardBuilder, tasks: List[Dict[str, Any]], first: int = 0) -> List[int]:
+    """Кнопки-номера (карточка задачи) по LIST_ROW_SIZE в ряду; возвращает размеры рядов"""
+    for i, task in enumerate(tasks):
+        kb.button(text=str(first + i + 1), callback_data=f"card:{task['id']}")
+    rows = [LIST_ROW_SIZE] * (len(tasks) // LIST_ROW_SIZE)
+    if len(tasks) % LIST_ROW_SIZE:
+        rows.append(len(tasks) % LIST_ROW_SIZE)
+    return rows
+
+
+def _callback_button(kb: InlineKeyboardBuilder, text: str, callback_data: str) -> bool:
+    """Добавить кнопку, если callback_data укладывается в лимит Telegram"""
+    if len(callback_data.encode()) > CALLBACK_DATA_LIMIT:
+        return False
+    kb.button(text=text, callback_data=callback_data)
+    return True
+
+
+def render_task_page(
+    kind: str,
+    page: TasksPage,
+    page_no: int = 1,
+    cursor: Optional[str] = None
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """
+    Одно сообщение со страницей списка: строки задач, кнопки-номера
+    (карточка задачи), навигация ◀️/▶️ по курсорам и кнопка «карточками».
+    Курсор соседней страницы едет в callback_data: list:<kind>:<page_no>:<cursor>;
+    cursor - курсор, которым получена сама страница page.
+    """
+    tasks = page['results']
+    counts = page.get('status_counts')
+    first = (page_no - 1) * LIST_PAGE_SIZE
+    
+    text = ""
+    if counts:
+        text += (
+            f"📋 <b>Ваши задачи:</b> {counts['total']}\n"
+            f"⏳ Активных: {counts['pending'] + counts['in_progress']} · "
+            f"✅ Завершённых: {counts['completed']}\n\n"
+        )
+    text += TASK_LIST_TITLES[kind]
+    if not tasks:
+        return text + "\n\n📭 Список пуст", InlineKeyboardBuilder().as_markup()
+    
+    text += f" (стр. {page_no})\n\n"
+    text += "\n".join(format_task_line(first + i + 1, task) for i, task in enumerate(tasks))
+    
+    kb = InlineKeyboardBuilder()
+    rows = _card_buttons(kb, tasks, first)
+    
+    nav = 0
+    if page['previous_cursor'] and page_no > 1:
+        nav += _callback_button(
+            kb, "◀️", f"list:{kind}:{page_no - 1}:{page['previous_cursor']}"
+        )
+    if page['next_cursor']:
+        nav += _callback_button(
+            kb, "▶️", f"list:{kind}:{page_no + 1}:{page['next_cursor']}"
+        )
+    if nav:
+        rows.append(nav)
+    
+    if _callback_button(kb, "📇 Карточками", f"cards:{kind}:{cursor or ''}"):
+        rows.append(1)
+    if counts and counts['completed']:
+        kb.button(text=f"✅ Показать завершённые ({counts['completed']})",
+                  callback_data="show_completed")
+        rows.append(1)
+    
+    kb.adjust(*rows)
+    return text, kb.as_markup()
+
+
+async def send_task_cards(message: Message, tasks: List[Dict[str, Any]]):
+    """Отдельные карточки задач с кнопками: по порядку, в темпе лимита чата"""
+    await send_many(message.chat.id, [
+        lambda task=task: message.answer(
+            format_task(task),
+            reply_markup=get_task_keyboard(task).as_markup()
+        )
+        for task in tasks
+    ])
+
+
 @router.message(Command('tasks'))
 @router.message(F.text == "📋 Мои задачи")
 async def cmd_tasks(message: Message, token: str, api_client: APIClient):
     """Показать все задачи"""
     try:
-        # По умолчанию показываем только активные задачи
-        # (можно передать ?status=-completed,-cancelled)
-        tasks = await api_client.get_tasks(token)
+        # Первая страница активных + счётчики по всем статусам одним запросом
+        page = await load_task_page('a', token, api_client, with_counts=True)
         
-        if not tasks:
+        if not page['status_counts']['total']:
             await message.answer(
                 "📭 У вас пока нет задач.\n\n"
                 "Используйте /create чтобы создать первую задачу."
             )
             return
         
-        # Фильтруем только активные задачи для списка
-        active_tasks = [t for t in tasks if t['status'] in ['pending', 'in_progress']]
-        completed_tasks = [t for t in tasks if t['status'] == 'completed']
-        
-        # Показываем статистику
-        await message.answer(
-            f"📋 <b>Ваши задачи:</b>\n\n"
-            f"⏳ Активных: {len(active_tasks)}\n"
-            f"✅ Завершённых: {len(completed_tasks)}\n"
-            f"📊 Всего: {len(tasks)}"
-        )
-        
-        # Показываем активные задачи
-        if active_tasks:
-            await message.answer("⏳ <b>Активные задачи:</b>")
-            for task in active_tasks[:10]:  # Первые 10
-                kb = get_task_keyboard(task)
-                await message.answer(
-                    format_task(task),
-                    reply_markup=kb.as_markup()
-                )
-        
-        # Если есть завершённые - предлагаем посмотреть
-        if completed_tasks:
-            kb = InlineKeyboardBuilder()
-            kb.button(text=f"✅ Показать завершённые ({len(completed_tasks)})", 
-                     callback_data="show_completed")
-            await message.answer(
-                "Есть завершённые задачи:",
-                reply_markup=kb.as_markup()
-            )
-        
-        if len(active_tasks) > 10:
-            await message.answer(f"... и ещё {len(active_tasks) - 10} активных задач")
+        # Статистика, активные задачи и навигация - одним сообщением
+        text, markup = render_task_page('a', page)
+        await message.answer(text, reply_markup=markup)
     
     except APIError as e:
         await message.answer(f"❌ Ошибка API: {e.detail}")
@@ -142,22 +243,70 @@ async def cmd_tasks(message: Message, token: str, api_client: APIClient):
 async def show_completed_tasks(callback: CallbackQuery, token: str, api_client: APIClient):
     """Показать завершённые задачи"""
     try:
-        tasks = await api_client.get_tasks(token)
-        completed_tasks = [t for t in tasks if t['status'] == 'completed']
+        page = await load_task_page('c', token, api_client)
         
-        if not completed_tasks:
+        if not page['results']:
             await callback.answer("Нет завершённых задач")
             return
         
-        await callback.message.answer("✅ <b>Завершённые задачи:</b>")
-        
-        for task in completed_tasks[:10]:
-            kb = get_task_keyboard(task)
-            await callback.message.answer(
-                format_task(task),
-                reply_markup=kb.as_markup()
-            )
-        
+        text, markup = render_task_page('c', page)
+        await callback.message.answer(text, reply_markup=markup)
+        await callback.answer()
+    except APIError as e:
+        await callback.answer(f"❌ Ошибка: {e.detail}", show_alert=True)
+
+
+@router.callback_query(F.data.startswith("list:"))
+async def callback_task_list_page(callback: CallbackQuery, token: str, api_client: APIClient):
+    """
+    Соседняя страница компактного списка - в том же сообщении.
+    Загружается только она: курсор из callback_data.
+    """
+    _, kind, page_no, cursor = callback.data.split(':', 3)
+    page_no = int(page_no)
+    
+    try:
+        # Счётчики - только на первой странице активных, как в /tasks
+        page = await load_task_page(
+            kind, token, api_client, cursor,
+            with_counts=kind == 'a' and page_no == 1
+        )
+        text, markup = render_task_page(kind, page, page_no, cursor)
+        try:
+            await callback.message.edit_text(text, reply_markup=markup)
+        except TelegramBadRequest as e:
+            # Повторное нажатие на ту же страницу
+            if 'message is not modified' not in str(e):
+                raise
+        await callback.answer()
+    except APIError as e:
+        await callback.answer(f"❌ Ошибка: {e.detail}", show_alert=True)
+
+
+@router.callback_query(F.data.startswith("cards:"))
+async def callback_task_list_cards(callback: CallbackQuery, token: str, api_client: APIClient):
+    """Страница списка отдельными карточками с кнопками действий"""
+    _, kind, cursor = callback.data.split(':', 2)
+    
+    try:
+        page = await load_task_page(kind, token, api_client, cursor or None)
+        await callback.answer()
+        await send_task_cards(callback.message, page['results'])
+    except APIError as e:
+        await callback.answer(f"❌ Ошибка: {e.detail}", show_alert=True)
+
+
+@router.callback_query(F.data.startswith("card:"))
+async def callback_task_card(callback: CallbackQuery, token: str, api_client: APIClient):
+    """Карточка одной задачи из компактного списка"""
+    task_id = callback.data.split(':')[1]
+    
+    try:
+        task = await api_client.get_task(token, task_id)
+        await callback.message.answer(
+            format_task(task),
+            reply_markup=get_task_keyboard(task).as_markup()
+        )
         await callback.answer()
     except APIError as e:
         await callback.answer(f"❌ Ошибка: {e.detail}", show_alert=True)
@@ -266,25 +415,48 @@ async def callback_back(callback: CallbackQuery):
     await callback.answer()
 
 
+@router.message(Command('find'))
+async def cmd_find(message: Message, command: CommandObject, token: str, api_client: APIClient):
+    """Поиск задач: /find <текст>"""
+    query = (command.args or '').strip()
+    if not query:
+        await message.answer("🔍 Использование: /find &lt;текст&gt;")
+        return
+    
+    try:
+        tasks = await api_client.search_tasks(token, query)
+        
+        if not tasks:
+            await message.answer(f"🔍 По запросу «{escape(query)}» ничего не найдено.")
+            return
+        
+        # Первые LIST_PAGE_SIZE по релевантности - одним сообщением, порядок сохраняется
+        tasks = tasks[:LIST_PAGE_SIZE]
+        text = f"🔍 <b>Найдено по запросу «{escape(query)}»:</b>\n\n"
+        text += "\n".join(format_task_line(i + 1, task) for i, task in enumerate(tasks))
+        kb = InlineKeyboardBuilder()
+        kb.adjust(*_card_buttons(kb, tasks))
+        await message.answer(text, reply_markup=kb.as_markup())
+    
+    except APIError as e:
+        await message.answer(f"❌ Ошибка API: {e.detail}")
+    except Exception as e:
+        await message.answer(f"❌ Ошибка: {str(e)}")
+
+
 @router.message(Command('overdue'))
 @router.message(F.text == "⚠️ Просроченные")
 async def cmd_overdue(message: Message, token: str, api_client: APIClient):
     """Показать просроченные задачи"""
     try:
-        tasks = await api_client.get_overdue_tasks(token)
+        page = await load_task_page('o', token, api_client)
         
-        if not tasks:
+        if not page['results']:
             await message.answer("✅ У вас нет просроченных задач!")
             return
         
-        await message.answer(f"⚠️ <b>Просроченные задачи ({len(tasks)}):</b>")
-        
-        for task in tasks:
-            kb = get_task_keyboard(task)
-            await message.answer(
-                format_task(task),
-                reply_markup=kb.as_markup()
-            )
+        text, markup = render_task_page('o', page)
+        await message.answer(text, reply_markup=markup)
     
     except APIError as e:
         await message.answer(f"❌ Ошибка API: {e.detail}")
\ No newline at end of file
@@ -6,6 +6,7 @@ from aiogram.enums import ParseMode
 
 from config import config
 from services.api_client import APIClient
+from services.token_storage import token_storage
 from middlewares.auth import AuthMiddleware
 from handlers import start, tasks, create_task, categories
 
@@ -21,7 +22,19 @@ async def main():
     """Главная функция запуска бота"""
     
     # Инициализация API клиента
-    api_client = APIClient(config.api_base_url)
+    api_client = APIClient(
+        config.api_base_url,
+        cache_ttl=config.api_cache_ttl,
+        cache_size=config.api_cache_size,
+        pool_size=config.api_pool_size,
+        timeout=config.api_timeout,
+        connect_timeout=config.api_connect_timeout,
+        keepalive_timeout=config.api_keepalive_timeout,
+        max_retries=config.api_max_retries,
+        hedge_delay=config.api_hedge_delay or None,
+        breaker_threshold=config.api_breaker_threshold,
+        breaker_reset_timeout=config.api_breaker_reset_timeout
+    )
     await api_client.start()
     
     # Инициализация бота и диспетчера
@@ -32,8 +45,10 @@ async def main():
     dp = Dispatcher()
     
     # Регистрация middleware
-    dp.message.middleware(AuthMiddleware(api_client))
-    dp.callback_query.middleware(AuthMiddleware(api_client))
+    # Один экземпляр на оба типа апдейтов: общая single-flight регистрация
+    auth_middleware = AuthMiddleware(api_client)
+    dp.message.middleware(auth_middleware)
+    dp.callback_query.middleware(auth_middleware)
     
     # Регистрация роутеров
     dp.include_router(start.router)
@@ -49,6 +64,7 @@ async def main():
         await dp.start_polling(bot)
     finally:
         await api_client.close()
+        await token_storage.close()
         await bot.session.close()
 
 
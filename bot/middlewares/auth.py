@@ -1,18 +1,33 @@
-from typing import Callable, Dict, Any, Awaitable
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable, Optional
 from aiogram import BaseMiddleware
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, User
 
 from services.token_storage import token_storage
 from services.api_client import APIClient
 
 
 class AuthMiddleware(BaseMiddleware):
-    """Middleware для автоматической аутентификации"""
-    
+    """
+    Middleware для автоматической аутентификации.
+
+    Регистрация идёт через single-flight: параллельные апдейты одного
+    пользователя ждут один общий запрос к /auth/telegram/.
+    На 401 от backend'а APIClient вызывает refresh_token и повторяет запрос
+    с новым токеном - устаревший токен восстанавливается незаметно.
+    """
+
+    # Сколько последних токенов помнить для повторной аутентификации
+    max_token_owners = 10000
+
     def __init__(self, api_client: APIClient):
         super().__init__()
         self.api_client = api_client
-    
+        self.api_client.token_refresher = self.refresh_token
+        self._pending: Dict[int, asyncio.Task] = {}
+        self._token_owners: OrderedDict[str, User] = OrderedDict()
+
     async def __call__(
         self,
         handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
@@ -23,30 +38,69 @@ class AuthMiddleware(BaseMiddleware):
 
         if user is None:
             return
-        
+
         # Проверяем есть ли токен
-        token = token_storage.get_token(user.id)
-        
+        token = await token_storage.get_token(user.id)
+
         if not token:
             # Регистрируем пользователя
             try:
-                result = await self.api_client.register_user(
-                    telegram_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name,
-                    last_name=user.last_name
-                )
-                token = result['token']
-                token_storage.save_token(user.id, token)
+                token = await self._register(user)
             except Exception as e:
                 if isinstance(event, Message):
                     await event.answer(
                         "❌ Ошибка аутентификации. Попробуйте позже."
                     )
                 return
-        
+
+        self._remember(token, user)
+
         # Добавляем токен в data
         data['token'] = token
         data['api_client'] = self.api_client
-        
-        return await handler(event, data) #type: ignore
\ No newline at end of file
+
+        return await handler(event, data) #type: ignore
+
+    async def refresh_token(self, stale_token: str) -> Optional[str]:
+        """Получить новый токен взамен отклонённого backend'ом (401)"""
+        user = self._token_owners.get(stale_token)
+        if user is None:
+            return None
+
+        # Токен уже обновлён параллельным запросом
+        current = await token_storage.get_token(user.id)
+        if current and current != stale_token:
+            return current
+
+        token = await self._register(user)
+        self._remember(token, user)
+        return token
+
+    async def _register(self, user: User) -> str:
+        """Зарегистрировать пользователя (один запрос на telegram_id одновременно)"""
+        task = self._pending.get(user.id)
+
+        if task is None:
+            task = asyncio.create_task(self._do_register(user))
+            self._pending[user.id] = task
+            task.add_done_callback(lambda _: self._pending.pop(user.id, None))
+
+        # shield: отмена одного handler'а не отменяет общую регистрацию
+        return await asyncio.shield(task)
+
+    async def _do_register(self, user: User) -> str:
+        result = await self.api_client.register_user(
+            telegram_id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name
+        )
+        token = result['token']
+        await token_storage.save_token(user.id, token)
+        return token
+
+    def _remember(self, token: str, user: User):
+        self._token_owners[token] = user
+        self._token_owners.move_to_end(token)
+        while len(self._token_owners) > self.max_token_owners:
+            self._token_owners.popitem(last=False)
@@ -1,57 +1,356 @@
+import asyncio
+import copy
+import json
 import logging
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Sequence, TypedDict, Union
 import aiohttp
 from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость: без неё стандартный json
+    orjson = None
+
+from services.resilience import CircuitBreaker, RetryBudget, backoff_delay, hedged
 
 logger = logging.getLogger(__name__)
 
+# Повторяются только идемпотентные запросы и только при недоступности backend'а
+RETRY_METHODS = frozenset({'GET', 'HEAD'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+if orjson is not None:
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+    
+    json_loads = orjson.loads
+else:
+    json_dumps = json.dumps
+    json_loads = json.loads
+
+
+class StatusCounts(TypedDict):
+    """Количество задач по статусам (/tasks/my/?counts=1)"""
+    pending: int
+    in_progress: int
+    completed: int
+    cancelled: int
+    total: int
+
+
+class TaskStats(StatusCounts):
+    """Статистика задач (/tasks/stats/)"""
+    overdue: int
+    due_today: int
+
+
+class TasksPage(TypedDict):
+    """Страница задач"""
+    results: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+    status_counts: Optional[StatusCounts]
+
+
+class ResponseCache:
+    """
+    LRU ответов API с ограничением размера и необязательным TTL.
+    Значения копируются при записи и чтении: вызывающий может менять
+    полученные dict/list, не портя кеш.
+    """
+    
+    def __init__(self, size: int, ttl: Optional[float] = None):
+        self.size = size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[tuple, tuple[Any, float]]' = OrderedDict()
+    
+    def get(self, key: tuple) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+    
+    def set(self, key: tuple, value: Any):
+        if self.size <= 0 or self.ttl == 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else float('inf')
+        self._entries[key] = (copy.deepcopy(value), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key: tuple):
+        self._entries.pop(key, None)
+
+
+@dataclass
+class PoolStats:
+    """Счётчики пула соединений APIClient (через aiohttp TraceConfig)"""
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    # Ожидания свободного соединения при исчерпанном лимите пула
+    queued: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+    
+    @property
+    def reuse_ratio(self) -> float:
+        """Доля запросов, ушедших по уже открытому (keep-alive) соединению"""
+        total = self.new_connections + self.reused_connections
+        return self.reused_connections / total if total else 0.0
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'new_connections': self.new_connections,
+            'reused_connections': self.reused_connections,
+            'reuse_ratio': round(self.reuse_ratio, 3),
+            'queued': self.queued,
+            'queue_wait_total': round(self.queue_wait_total, 3),
+            'queue_wait_max': round(self.queue_wait_max, 3),
+        }
+
 
 class APIClient:
     """Клиент для работы с Django API"""
     
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        etag_cache_size: int = 256,
+        cache_ttl: float = 30,
+        cache_size: int = 1000,
+        pool_size: int = 100,
+        timeout: float = 10,
+        connect_timeout: float = 3,
+        keepalive_timeout: float = 30,
+        max_retries: int = 3,
+        hedge_delay: Optional[float] = None,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 5.0
+    ):
         self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.pool_stats = PoolStats()
+        self.max_retries = max_retries
+        # Через сколько секунд дублировать медленный get_tasks_page (None - не дублировать)
+        self.hedge_delay = hedge_delay
+        self.retry_budget = RetryBudget()
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
         self.session: Optional[aiohttp.ClientSession] = None
+        # Вызывается на 401: принимает отклонённый токен, возвращает новый
+        self.token_refresher: Optional[Callable[[str], Awaitable[Optional[str]]]] = None
+        # Условные GET: (токен, url, params) -> (ETag, ответ)
+        self._etag_cache = ResponseCache(etag_cache_size)
+        # Read-through кеш категорий и деталей задач: ответ без запроса
+        # к backend'у в пределах cache_ttl, сброс на собственных изменениях
+        self._cache = ResponseCache(cache_size, cache_ttl)
     
     async def start(self):
-        """Инициализация сессии"""
-        self.session = aiohttp.ClientSession()
+        """
+        Инициализация сессии: один пул keep-alive соединений к backend'у
+        (не больше pool_size одновременно), кеш DNS, таймауты на запрос.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            ttl_dns_cache=300,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            json_serialize=json_dumps,
+            trace_configs=[self._trace_config()]
+        )
     
     async def close(self):
         """Закрытие сессии"""
         if self.session:
+            logger.info(f"API pool stats: {self.pool_stats.as_dict()}")
             await self.session.close()
     
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Хуки aiohttp для PoolStats"""
+        stats = self.pool_stats
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, ctx: SimpleNamespace, params):
+            stats.requests += 1
+        
+        async def on_queued_start(session, ctx: SimpleNamespace, params):
+            ctx.queued_at = time.monotonic()
+        
+        async def on_queued_end(session, ctx: SimpleNamespace, params):
+            waited = time.monotonic() - ctx.queued_at
+            stats.queued += 1
+            stats.queue_wait_total += waited
+            stats.queue_wait_max = max(stats.queue_wait_max, waited)
+        
+        async def on_create_end(session, ctx: SimpleNamespace, params):
+            stats.new_connections += 1
+        
+        async def on_reuse(session, ctx: SimpleNamespace, params):
+            stats.reused_connections += 1
+        
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+    
     async def _request(
         self,
         method: str,
         endpoint: str,
         token: Optional[str] = None,
+        retry_auth: bool = True,
         **kwargs
     ) -> Dict[str, Any]:
-        """Базовый метод для запросов"""
+        """
+        Базовый метод для запросов.
+        GET-ответы с ETag запоминаются: повторный запрос идёт
+        с If-None-Match, и на 304 возвращается сохранённый ответ.
+        """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        headers = kwargs.pop('headers', {})
+        headers = dict(kwargs.pop('headers', {}))
         
         if token:
             headers['Authorization'] = f'Token {token}'
         
+        cache_key = cached = None
+        if method == 'GET':
+            cache_key = (token, url, tuple(sorted((kwargs.get('params') or {}).items())))
+            cached = self._etag_cache.get(cache_key)
+            if cached is not None:
+                headers['If-None-Match'] = cached[0]
+        
+        status, data, etag = await self._send_with_retries(method, url, headers, **kwargs)
+        
+        if status == 204:  # No content
+            return {}
+        if status == 304 and cached is not None:
+            return cached[1]
+        
+        # Токен отклонён - получаем новый и повторяем запрос один раз
+        if status == 401 and token and retry_auth and self.token_refresher:
+            new_token = await self.token_refresher(token)
+            if new_token and new_token != token:
+                logger.info("Token rejected by API, retrying with a fresh one")
+                headers.pop('Authorization', None)
+                headers.pop('If-None-Match', None)
+                return await self._request(
+                    method, endpoint, token=new_token, retry_auth=False,
+                    headers=headers, **kwargs
+                )
+        
+        if status >= 400:
+            logger.error(f"API Error {status}: {data}")
+            raise APIError(status, data)
+        
+        if cache_key and etag:
+            self._etag_cache.set(cache_key, (etag, data))
+        
+        return data
+    
+    async def _send(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> tuple:
+        """Одна попытка запроса: (status, data, ETag). Сетевые ошибки - APIError(0)"""
         try:
             async with self.session.request(method, url, headers=headers, **kwargs) as response: #type: ignore
-                if response.status == 204:  # No content
-                    return {}
-                
-                data = await response.json()
-                
-                if response.status >= 400:
-                    logger.error(f"API Error {response.status}: {data}")
-                    raise APIError(response.status, data)
+                if response.status in (204, 304):
+                    return response.status, {}, None
                 
-                return data
+                data = _decode_body(await response.read())
+                return response.status, data, response.headers.get('ETag')
         
         except aiohttp.ClientError as e:
-            logger.error(f"Network error: {e}")
-            raise APIError(0, str(e))
+            # Сюда же попадает таймаут соединения (ServerTimeoutError)
+            logger.error(f"Network error: {e!r}")
+            raise APIError(0, str(e) or type(e).__name__)
+        except asyncio.TimeoutError:
+            logger.error(f"API timeout: {method} {url}")
+            raise APITimeoutError(0, 'Backend timeout')
+    
+    async def _send_with_retries(self, method: str, url: str, headers: Dict[str, str], **kwargs) -> tuple:
+        """
+        Запрос через circuit breaker: пока backend недоступен, запросы
+        сразу завершаются APIError(0) без сетевого вызова.
+        GET/HEAD при сетевой ошибке или 502/503/504 повторяются
+        (max_retries раз с экспоненциальной задержкой), если это
+        позволяет общий бюджет повторов. Истёкший общий таймаут
+        (медленный backend) не повторяется, а все попытки укладываются
+        в один срок timeout.total - обработчик не висит дольше.
+        """
+        if not self.breaker.allow():
+            raise APIError(0, 'Backend unavailable')
+        
+        self.retry_budget.deposit()
+        deadline = time.monotonic() + (self.timeout.total or 0)
+        attempt = 0
+        while True:
+            error = result = None
+            try:
+                result = await self._send(method, url, headers, **kwargs)
+            except APIError as e:
+                error = e
+            
+            if result is not None and result[0] not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return result
+            self.breaker.record_failure()
+            
+            delay = backoff_delay(attempt)
+            if (
+                method not in RETRY_METHODS
+                or isinstance(error, APITimeoutError)
+                or attempt >= self.max_retries
+                or time.monotonic() + delay >= deadline
+                or not self.breaker.allow()
+                or not self.retry_budget.withdraw()
+            ):
+                if error is not None:
+                    raise error
+                return result
+            
+            attempt += 1
+            logger.warning(f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+    
+    async def _cached(self, key: tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из read-through кеша или load() с сохранением в кеш"""
+        value = self._cache.get(key)
+        if value is None:
+            value = await load()
+            self._cache.set(key, value)
+        return value
+    
+    def _prime_tasks(self, token: str, tasks: List[Dict[str, Any]]):
+        """
+        Положить задачи из /tasks/my/ в кеш деталей: этот эндпоинт отдаёт
+        полный TaskDetailSerializer, и открытие карточки после списка
+        не идёт в backend. /tasks/overdue/ отдаёт сокращённые задачи и не подходит.
+        """
+        for task in tasks:
+            self._cache.set(('task', token, task['id']), task)
+    
+    def _invalidate_task(self, token: str, task_id: str):
+        """Задача изменена этим клиентом: детали и счётчики категорий устарели"""
+        self._cache.invalidate(('task', token, task_id))
+        self._cache.invalidate(('categories',))
     
     # Auth endpoints
     async def register_user(
@@ -78,26 +377,71 @@ class APIClient:
     async def get_tasks(
         self,
         token: str,
-        status: Optional[str] = None,
+        status: Optional[Union[str, Sequence[str]]] = None,
         category_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Получить список задач"""
-        params = {}
+        """Получить список задач (первая страница)"""
+        page = await self.get_tasks_page(token, status=status, category_id=category_id)
+        return page['results']
+    
+    async def get_tasks_page(
+        self,
+        token: str,
+        status: Optional[Union[str, Sequence[str]]] = None,
+        category_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_counts: bool = False,
+        page_size: Optional[int] = None
+    ) -> 'TasksPage':
+        """
+        Получить страницу задач через keyset-пагинацию.
+        
+        status - один статус, несколько (['pending', 'in_progress'])
+        или исключающий ('-completed').
+        next_cursor/previous_cursor передаются в следующий вызов для получения
+        соседней страницы.
+        with_counts - вернуть также status_counts (счётчики без учёта status).
+        page_size - размер страницы (по умолчанию PAGE_SIZE backend'а).
+        """
+        params = _page_params(cursor, page_size)
         if status:
-            params['status'] = status
+            params['status'] = status if isinstance(status, str) else ','.join(status)
         if category_id:
             params['category'] = category_id
+        if with_counts:
+            params['counts'] = '1'
         
-        response = await self._request('GET', '/tasks/my/', token=token, params=params)
+        load = lambda: self._request('GET', '/tasks/my/', token=token, params=params)
+        if self.hedge_delay:
+            response = await hedged(load, self.hedge_delay, self.retry_budget)
+        else:
+            response = await load()
         
-        # Handle pagination
+        page = _to_page(response)
+        self._prime_tasks(token, page['results'])
+        return page
+    
+    async def search_tasks(self, token: str, query: str) -> List[Dict[str, Any]]:
+        """
+        Полнотекстовый поиск задач (первая страница, по релевантности).
+        Без cursor-пагинации: она сортирует по id, а не по рангу.
+        """
+        response = await self._request(
+            'GET', '/tasks/my/', token=token, params={'search': query}
+        )
         if 'results' in response:
-            return response['results']
-        return response if isinstance(response, list) else []
+            tasks = response['results']
+        else:
+            tasks = response if isinstance(response, list) else []
+        self._prime_tasks(token, tasks)
+        return tasks
     
     async def get_task(self, token: str, task_id: str) -> Dict[str, Any]:
-        """Получить детали задачи"""
-        return await self._request('GET', f'/tasks/{task_id}/', token=token)
+        """Получить детали задачи (из кеша, если задача недавно запрашивалась)"""
+        return await self._cached(
+            ('task', token, task_id),
+            lambda: self._request('GET', f'/tasks/{task_id}/', token=token)
+        )
     
     async def create_task(
         self,
@@ -117,7 +461,39 @@ class APIClient:
         if category_ids:
             data['category_ids'] = category_ids #type: ignore
         
-        return await self._request('POST', '/tasks/', token=token, json=data)
+        task = await self._request('POST', '/tasks/', token=token, json=data)
+        if category_ids:
+            self._cache.invalidate(('categories',))
+        return task
+    
+    async def bulk_create_tasks(
+        self,
+        token: str,
+        tasks: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Создать много задач одним запросом (всё или ничего).
+        Элементы: {'title', 'description', 'deadline', 'category_ids', 'status'}.
+        Возвращает {'created': N, 'ids': [...]}.
+        """
+        result = await self._request('POST', '/tasks/bulk/', token=token, json={'tasks': tasks})
+        self._cache.invalidate(('categories',))
+        return result
+    
+    async def bulk_update_status(
+        self,
+        token: str,
+        task_ids: Sequence[str],
+        status: str
+    ) -> Dict[str, Any]:
+        """Сменить статус у нескольких задач. Возвращает {'updated': N, 'not_found': [...]}"""
+        result = await self._request(
+            'POST', '/tasks/bulk_status/', token=token,
+            json={'ids': list(task_ids), 'status': status}
+        )
+        for task_id in task_ids:
+            self._invalidate_task(token, task_id)
+        return result
     
     async def update_task(
         self,
@@ -126,19 +502,30 @@ class APIClient:
         **fields
     ) -> Dict[str, Any]:
         """Обновить задачу"""
-        return await self._request('PATCH', f'/tasks/{task_id}/', token=token, json=fields)
+        task = await self._request('PATCH', f'/tasks/{task_id}/', token=token, json=fields)
+        self._invalidate_task(token, task_id)
+        return task
     
     async def delete_task(self, token: str, task_id: str) -> None:
         """Удалить задачу"""
         await self._request('DELETE', f'/tasks/{task_id}/', token=token)
+        self._invalidate_task(token, task_id)
     
     async def complete_task(self, token: str, task_id: str) -> Dict[str, Any]:
         """Отметить задачу выполненной"""
-        return await self._request('POST', f'/tasks/{task_id}/complete/', token=token)
+        task = await self._request('POST', f'/tasks/{task_id}/complete/', token=token)
+        self._invalidate_task(token, task_id)
+        return task
     
     async def cancel_task(self, token: str, task_id: str) -> Dict[str, Any]:
         """Отменить задачу"""
-        return await self._request('POST', f'/tasks/{task_id}/cancel/', token=token)
+        task = await self._request('POST', f'/tasks/{task_id}/cancel/', token=token)
+        self._invalidate_task(token, task_id)
+        return task
+    
+    async def get_task_stats(self, token: str) -> TaskStats:
+        """Получить статистику задач (кешируется на backend'е)"""
+        return await self._request('GET', '/tasks/stats/', token=token)
     
     async def get_overdue_tasks(self, token: str) -> List[Dict[str, Any]]:
         """Получить просроченные задачи"""
@@ -147,13 +534,31 @@ class APIClient:
             return response['results']
         return response if isinstance(response, list) else []
     
+    async def get_overdue_page(
+        self,
+        token: str,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None
+    ) -> 'TasksPage':
+        """Страница просроченных задач (keyset-пагинация, как get_tasks_page)"""
+        response = await self._request(
+            'GET', '/tasks/overdue/', token=token, params=_page_params(cursor, page_size)
+        )
+        return _to_page(response)
+    
     # Category endpoints
     async def get_categories(self, token: str) -> List[Dict[str, Any]]:
-        """Получить список категорий"""
-        response = await self._request('GET', '/categories/', token=token)
-        if 'results' in response:
-            return response['results']
-        return response if isinstance(response, list) else []
+        """
+        Получить список категорий.
+        Категории общие для всех пользователей, поэтому кеш один на клиент.
+        """
+        async def load():
+            response = await self._request('GET', '/categories/', token=token)
+            if 'results' in response:
+                return response['results']
+            return response if isinstance(response, list) else []
+        
+        return await self._cached(('categories',), load)
     
     async def create_category(
         self,
@@ -162,12 +567,63 @@ class APIClient:
         color: str = '#808080'
     ) -> Dict[str, Any]:
         """Создать категорию"""
-        return await self._request(
+        category = await self._request(
             'POST',
             '/categories/',
             token=token,
             json={'name': name, 'color': color}
         )
+        self._cache.invalidate(('categories',))
+        return category
+
+
+def _decode_body(body: bytes) -> Any:
+    """
+    Тело ответа как JSON; не-JSON (HTML страница 502 от прокси,
+    debug-страница Django) - как обрезанный текст для APIError.
+    """
+    if not body:
+        return {}
+    try:
+        return json_loads(body)
+    except ValueError:
+        return body[:500].decode(errors='replace')
+
+
+def _page_params(cursor: Optional[str], page_size: Optional[int]) -> Dict[str, str]:
+    """Параметры запроса страницы в cursor-режиме"""
+    params = {'pagination': 'cursor'}
+    if cursor:
+        params['cursor'] = cursor
+    if page_size:
+        params['page_size'] = str(page_size)
+    return params
+
+
+def _to_page(response: Any) -> TasksPage:
+    """Ответ cursor-пагинации (или список без пагинации) как TasksPage"""
+    if isinstance(response, list):
+        return {
+            'results': response,
+            'next_cursor': None,
+            'previous_cursor': None,
+            'status_counts': None
+        }
+    
+    return {
+        'results': response.get('results', []),
+        'next_cursor': _extract_cursor(response.get('next')),
+        'previous_cursor': _extract_cursor(response.get('previous')),
+        'status_counts': response.get('status_counts')
+    }
+
+
+def _extract_cursor(url: Optional[str]) -> Optional[str]:
+    """Достать значение cursor из next/previous ссылки"""
+    if not url:
+        return None
+    values = parse_qs(urlsplit(url).query).get('cursor')
+    return values[0] if values else None
 
 
 class APIError(Exception):
@@ -176,4 +632,8 @@ class APIError(Exception):
     def __init__(self, status_code: int, detail: Any):
         self.status_code = status_code
         self.detail = detail
-        super().__init__(f"API Error {status_code}: {detail}")
\ No newline at end of file
+        super().__init__(f"API Error {status_code}: {detail}")
+
+
+class APITimeoutError(APIError):
+    """Backend не ответил за общий таймаут запроса (не повторяется)"""
\ No newline at end of file
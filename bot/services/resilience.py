@@ -0,0 +1,115 @@
+"""
+Устойчивость запросов к backend'у: бюджет повторов, circuit breaker,
+экспоненциальная задержка и hedged-запросы.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def backoff_delay(attempt: int, base: float = 0.25, cap: float = 2.0) -> float:
+    """Задержка перед повтором attempt (с 0): экспонента с полным jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Общий на клиент бюджет повторов: каждый запрос добавляет ratio
+    токена (не больше max_tokens), каждый повтор или hedge тратит один.
+    Повторы не превышают ~ratio от трафика и не добивают
+    восстанавливающийся backend.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+
+    def deposit(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    После failure_threshold сбоев подряд цепь размыкается: запросы сразу
+    отклоняются reset_timeout секунд. Затем пропускается один пробный
+    запрос (half-open): успех замыкает цепь, сбой снова размыкает.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._changed_at = 0.0
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос сейчас"""
+        if self.state == self.CLOSED:
+            return True
+
+        # Open: ждём reset_timeout. Half-open: пробный запрос уже идёт;
+        # если он пропал (отменён), через reset_timeout пускаем следующий
+        if time.monotonic() - self._changed_at < self.reset_timeout:
+            return False
+        self._set_state(self.HALF_OPEN)
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.OPEN:
+            return
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"API circuit breaker: {self.state} -> {state}")
+        self.state = state
+        self._changed_at = time.monotonic()
+
+
+async def hedged(load: Callable[[], Awaitable[T]], delay: float, budget: RetryBudget) -> T:
+    """
+    Hedged-запрос: если load() не ответил за delay секунд, запускается
+    второй такой же (если позволяет бюджет), возвращается первый успешный
+    результат, второй запрос отменяется.
+    """
+    pending = {asyncio.ensure_future(load())}
+    error = None
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done and budget.withdraw():
+            pending.add(asyncio.ensure_future(load()))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
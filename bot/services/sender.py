@@ -0,0 +1,67 @@
+"""
+Отправка нескольких сообщений в один чат.
+
+Telegram ограничивает частоту сообщений в чат (около 1 в секунду
+с короткими всплесками), поэтому сообщения в чат уходят в темпе
+CHAT_SEND_INTERVAL со всплеском до CHAT_BURST (GCRA). Темп общий
+для всех обработчиков этого чата. На 429 (TelegramRetryAfter) темп
+чата сдвигается на retry_after и сообщение повторяется.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+CHAT_SEND_INTERVAL = 1.0
+CHAT_BURST = 3
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+# Теоретическое время следующей отправки (TAT) по чатам
+_chat_tat: Dict[int, float] = {}
+
+
+def _reserve(chat_id: int) -> float:
+    """Занять слот отправки в чат; возвращает сколько ждать до него"""
+    now = time.monotonic()
+    if len(_chat_tat) > 10000:
+        # Чаты без отправок за последнее время больше не ограничены
+        for stale in [key for key, tat in _chat_tat.items() if tat < now]:
+            del _chat_tat[stale]
+    
+    tat = max(_chat_tat.get(chat_id, now), now)
+    _chat_tat[chat_id] = tat + CHAT_SEND_INTERVAL
+    return max(0.0, tat - (CHAT_BURST - 1) * CHAT_SEND_INTERVAL - now)
+
+
+def _postpone(chat_id: int, delay: float):
+    """После 429 не отправлять в чат раньше чем через delay секунд"""
+    # С учётом всплеска: _reserve отдаст первый слот не раньше now + delay
+    tat = time.monotonic() + delay + (CHAT_BURST - 1) * CHAT_SEND_INTERVAL
+    _chat_tat[chat_id] = max(_chat_tat.get(chat_id, 0.0), tat)
+
+
+async def send_paced(chat_id: int, send: Callable[[], Awaitable[Any]]) -> Any:
+    """Выполнить send (одно сообщение в чат chat_id) в темпе лимита чата"""
+    for attempt in range(MAX_RETRY_AFTER_ATTEMPTS):
+        delay = _reserve(chat_id)
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            return await send()
+        except TelegramRetryAfter as e:
+            if attempt == MAX_RETRY_AFTER_ATTEMPTS - 1:
+                raise
+            logger.warning(f"Telegram flood control, retry in {e.retry_after}s")
+            _postpone(chat_id, e.retry_after)
+
+
+async def send_many(chat_id: int, senders: Sequence[Callable[[], Awaitable[Any]]]) -> List[Any]:
+    """
+    Выполнить senders (каждый отправляет одно сообщение) по порядку
+    в темпе лимита чата chat_id: порядок доставки совпадает с порядком senders.
+    """
+    return [await send_paced(chat_id, send) for send in senders]
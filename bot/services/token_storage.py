@@ -1,28 +1,246 @@
-from typing import Optional, Dict
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlsplit
 
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBackend(ABC):
+    """Backend для хранения токенов"""
+
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[str]:
+        """Получить токен или None"""
+
+    @abstractmethod
+    async def set(self, user_id: int, token: str, ttl: int):
+        """Сохранить токен на ttl секунд"""
+
+    @abstractmethod
+    async def delete(self, user_id: int):
+        """Удалить токен"""
+
+    async def close(self):
+        """Освободить ресурсы"""
+
+
+class MemoryTokenBackend(TokenBackend):
+    """In-memory хранилище (токены теряются при рестарте)"""
 
-class TokenStorage:
-    """Простое in-memory хранилище токенов"""
-    
     def __init__(self):
-        self._storage: Dict[int, str] = {}
-    
-    def save_token(self, user_id: int, token: str):
+        self._storage: Dict[int, Tuple[str, float]] = {}
+
+    async def get(self, user_id: int) -> Optional[str]:
+        entry = self._storage.get(user_id)
+        if entry is None:
+            return None
+        token, expires_at = entry
+        if expires_at <= time.time():
+            self._storage.pop(user_id, None)
+            return None
+        return token
+
+    async def set(self, user_id: int, token: str, ttl: int):
+        self._storage[user_id] = (token, time.time() + ttl)
+
+    async def delete(self, user_id: int):
+        self._storage.pop(user_id, None)
+
+
+class RedisTokenBackend(TokenBackend):
+    """Redis хранилище: общее для всех реплик бота, переживает рестарт"""
+
+    key_prefix = 'bot:token:'
+
+    def __init__(self, url: str):
+        from redis.asyncio import Redis
+
+        self._redis = Redis.from_url(url, decode_responses=True)
+
+    async def get(self, user_id: int) -> Optional[str]:
+        return await self._redis.get(f"{self.key_prefix}{user_id}")
+
+    async def set(self, user_id: int, token: str, ttl: int):
+        await self._redis.set(f"{self.key_prefix}{user_id}", token, ex=ttl)
+
+    async def delete(self, user_id: int):
+        await self._redis.delete(f"{self.key_prefix}{user_id}")
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class SQLiteTokenBackend(TokenBackend):
+    """
+    SQLite файл: переживает рестарт одной реплики без Redis.
+    Одно соединение используется из потоков asyncio.to_thread,
+    поэтому обращения к нему сериализуются блокировкой.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "user_id INTEGER PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _get(self, user_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT token FROM tokens WHERE user_id = ? AND expires_at > ?",
+                (user_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, user_id: int, token: str, ttl: int):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO tokens (user_id, token, expires_at) VALUES (?, ?, ?)",
+                (user_id, token, time.time() + ttl)
+            )
+            conn.commit()
+
+    def _delete(self, user_id: int):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM tokens WHERE user_id = ?", (user_id,))
+            conn.commit()
+
+    async def get(self, user_id: int) -> Optional[str]:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def set(self, user_id: int, token: str, ttl: int):
+        await asyncio.to_thread(self._set, user_id, token, ttl)
+
+    async def delete(self, user_id: int):
+        await asyncio.to_thread(self._delete, user_id)
+
+    async def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TokenStorage:
+    """
+    Хранилище токенов: локальный LRU поверх подключаемого backend'а.
+
+    LRU отвечает на повторные запросы без обращения к backend'у,
+    backend (Redis/SQLite) переживает рестарт и общий для реплик,
+    поэтому после рестарта бот не регистрирует заново всех пользователей.
+    """
+
+    def __init__(
+        self,
+        backend: TokenBackend,
+        ttl: int = 30 * 24 * 3600,
+        local_size: int = 10000,
+        local_ttl: int = 300
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self._local: OrderedDict[int, Tuple[str, float]] = OrderedDict()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'TokenStorage':
+        """
+        Создать хранилище по URL:
+        memory:// | redis://host:port/db | sqlite:///tokens.db (относительный путь)
+        | sqlite:////data/tokens.db (абсолютный путь)
+        """
+        scheme = urlsplit(url).scheme
+
+        if scheme in ('redis', 'rediss'):
+            backend = RedisTokenBackend(url)
+        elif scheme == 'sqlite':
+            backend = SQLiteTokenBackend(urlsplit(url).path[1:])
+        elif scheme == 'memory':
+            backend = MemoryTokenBackend()
+        else:
+            raise ValueError(f"Unsupported token storage: {url}")
+
+        return cls(backend, **kwargs)
+
+    def _get_local(self, user_id: int) -> Optional[str]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        token, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._local.pop(user_id, None)
+            return None
+        self._local.move_to_end(user_id)
+        return token
+
+    def _set_local(self, user_id: int, token: str):
+        self._local[user_id] = (token, time.monotonic() + self.local_ttl)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def save_token(self, user_id: int, token: str):
         """Сохранить токен пользователя"""
-        self._storage[user_id] = token
-    
-    def get_token(self, user_id: int) -> Optional[str]:
+        self._set_local(user_id, token)
+        try:
+            await self.backend.set(user_id, token, self.ttl)
+        except Exception as e:
+            logger.warning(f"Token storage unavailable: {e}")
+
+    async def get_token(self, user_id: int) -> Optional[str]:
         """Получить токен пользователя"""
-        return self._storage.get(user_id)
-    
-    def remove_token(self, user_id: int):
+        token = self._get_local(user_id)
+        if token is not None:
+            return token
+
+        try:
+            token = await self.backend.get(user_id)
+        except Exception as e:
+            logger.warning(f"Token storage unavailable: {e}")
+            return None
+
+        if token is not None:
+            self._set_local(user_id, token)
+        return token
+
+    async def remove_token(self, user_id: int):
         """Удалить токен пользователя"""
-        self._storage.pop(user_id, None)
-    
-    def has_token(self, user_id: int) -> bool:
+        self._local.pop(user_id, None)
+        try:
+            await self.backend.delete(user_id)
+        except Exception as e:
+            logger.warning(f"Token storage unavailable: {e}")
+
+    async def has_token(self, user_id: int) -> bool:
         """Проверить есть ли токен"""
-        return user_id in self._storage
+        return await self.get_token(user_id) is not None
+
+    async def close(self):
+        """Закрыть соединение с backend'ом"""
+        await self.backend.close()
 
 
 # Глобальное хранилище
-token_storage = TokenStorage()
\ No newline at end of file
+token_storage = TokenStorage.from_url(
+    config.token_storage_url,
+    ttl=config.token_ttl
+)
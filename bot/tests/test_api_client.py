@@ -0,0 +1,47 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from services.api_client import APIClient
+
+
+TASK = {
+    'id': '01ARZ3NDEKTSV4RRFFQ69G5FAV',
+    'title': 'Задача',
+    'description': 'Описание',
+    'status': 'pending',
+    'categories': []
+}
+
+
+class TestTaskCache:
+    """Тесты кеша деталей задач APIClient"""
+
+    def test_list_page_primes_task_cache(self):
+        """Тест что карточка, открытая после списка, не запрашивается у backend'а"""
+        client = APIClient('http://backend/api')
+        page = {'next': None, 'previous': None, 'results': [TASK]}
+        client._send = AsyncMock(return_value=(200, page, None))
+
+        async def scenario():
+            await client.get_tasks_page('token')
+            return await client.get_task('token', TASK['id'])
+
+        task = asyncio.run(scenario())
+
+        assert task == TASK
+        client._send.assert_awaited_once()
+
+    def test_cache_is_per_token(self):
+        """Тест что задачи из списка одного токена не отдаются другому"""
+        client = APIClient('http://backend/api')
+        page = {'next': None, 'previous': None, 'results': [TASK]}
+        client._send = AsyncMock(return_value=(200, page, None))
+
+        async def scenario():
+            await client.get_tasks_page('token')
+            client._send.return_value = (200, TASK, None)
+            await client.get_task('other-token', TASK['id'])
+
+        asyncio.run(scenario())
+
+        assert client._send.await_count == 2